@@ -1,135 +1,244 @@
 from fastapi import APIRouter, HTTPException
+import asyncio
 import json
-from fastapi import Depends, HTTPException, Request, BackgroundTasks
+import logging
+import time
+from typing import Dict, List, Optional
+from fastapi import Depends, HTTPException, Request
 from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.config import auth 
-from app.db.db import get_session, AsyncSessionLocal
-from app.services.memory.mem0_service import mem0
-from app.services.chat import chat_service
+from app.db.db import get_session
+from app.services.memory.write_behind import memory_writer
+from app.services.insights.insight_cache import mark_insights_dirty
+from app.services.cache.redis_manager import CacheManager
+from app.services.cache.tags import conversations_tag
+from app.services.llm.bed_rock import BedrockLLM
+from app.services.chat.sse import coalesce_tokens
+from app.services.chat.stream_hub import StreamHub, LiveStream, parse_event_id
+from app.config.settings import settings
 from app.repo.prompt_repo import PromptRepo
-from app.services.conversations.conversations_service import add_message_to_history, get_last_n_messages, create_new_conversation, get_conversation_by_id
+from app.services.conversations.history_cache import history_cache
+from app.services.conversations.turn_writer import turn_writer
+from app.services.chat.context_service import assemble_chat_context
 from app.services.titles.generate_title import generate_and_store_title
 
 from uuid import UUID
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/chat")
 
+llm = BedrockLLM(model_id="amazon.nova-lite-v1:0", temperature=0.4)
+
+stream_hub = StreamHub(
+    buffer_size=settings.chat_stream_buffer_events,
+    resume_grace_seconds=settings.chat_stream_resume_grace_seconds,
+    retention_seconds=settings.chat_stream_retention_seconds,
+)
+
+# How often the SSE loop asks the server whether the client is still there
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Storage and title generation after a reply, detached from the producer
+# (strong references: the loop keeps only weak ones to tasks)
+_storage_tasks: set = set()
+
+
+def _detach(coro):
+    task = asyncio.create_task(coro)
+    _storage_tasks.add(task)
+    task.add_done_callback(_storage_tasks.discard)
+
 # --- CHAT STREAM ENDPOINT ---
 @router.post("/stream")
 async def chat_stream(
     request: Request, 
-    background_tasks: BackgroundTasks, 
     session: AsyncSession = Depends(get_session), 
     current_user = Depends(auth.get_current_user)
 ):
+    user_id_uuid: UUID = current_user.user_id
+    user_id_str = str(user_id_uuid)
+
+    # =========================================================
+    # 0. RESUME (client reconnected with Last-Event-ID)
+    # =========================================================
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        return await _resume_stream(request, last_event_id, user_id_str)
+
     payload = await request.json()
     user_input = payload.get("text", "")
     
     # NEW: Get optional conversation_id from payload
     conversation_id_str = payload.get("conversation_id")
-    print(f"Convo id: {conversation_id_str}")
     if not user_input:
         raise HTTPException(status_code=400, detail="No text provided")
 
-    user_id_uuid: UUID = current_user.user_id
-    user_id_str = str(user_id_uuid)
-    
-    # =========================================================
-    # 1. SESSION MANAGEMENT (Create or Retrieve Conversation)
-    # =========================================================
-    conversation = None
+    conversation_id_uuid = None
     if conversation_id_str:
         try:
             conversation_id_uuid = UUID(conversation_id_str)
-            # Retrieve and validate the conversation belongs to the user
-            conversation = await get_conversation_by_id(session, conversation_id_uuid, user_id_uuid)
-            if not conversation:
-                 raise HTTPException(status_code=404, detail="Conversation not found or access denied.")
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid conversation_id format.")
-    
-    is_new_conversation = False
-
-    if not conversation:
-        conversation = await create_new_conversation(session, user_id_uuid)
-        await session.commit()
-        is_new_conversation = True
-
-    
-    # Get the final ID for use in history/persistence
-    conversation_id_uuid = conversation.id
-
 
     # =========================================================
-    # 2. SHORT-TERM CONTEXT: Retrieve History 
+    # 1-3. CONTEXT: conversation ownership, history and mem0 memories.
+    # The mem0 search runs concurrently under a latency budget.
     # =========================================================
-    # Now retrieves history *by conversation ID*
-    history = await get_last_n_messages(session, conversation_id_uuid, n=10)
+    chat_context = await assemble_chat_context(
+        session,
+        user_id_uuid,
+        user_input,
+        conversation_id=conversation_id_uuid,
+    )
+    if chat_context is None:
+        raise HTTPException(status_code=404, detail="Conversation not found or access denied.")
 
+    # Get the final ID for use in history/persistence
+    conversation_id_uuid = chat_context.conversation_id
+    is_new_conversation = chat_context.is_new_conversation
+    history = chat_context.history
+    memories = chat_context.memories
 
-    # =========================================================
-    # 3. LONG-TERM CONTEXT: mem0 retrieval (filters by app_id/user_id)
-    # =========================================================
-    # We can optionally filter mem0 by conversation_id if we store it there (see background task update)
-    filters = {"AND": [{"user_id": user_id_str}, {"app_id": "awaren_ai"}]}
-    memories = mem0.search(user_input, user_id=user_id_str, limit=5, filters=filters)
     context = "\n".join(m.get("memory", "") for m in memories) if memories else ""
-    
     system_prompt = PromptRepo.chat_system(memories=context)
 
 
-    # 4. Stream response and handle events
-    async def event_generator():
-        full_reply = ""
-        
-        try:
-            # STREAMING PHASE
-            async for chunk in chat_service.stream_generate(system_prompt, user_input, history=history): 
-                full_reply += chunk
-                yield {
-                    "event": "message",
-                    "data": json.dumps({"chunk": chunk})
-                }
+    # =========================================================
+    # 4. GENERATION (detached from this connection, see stream_hub)
+    # =========================================================
+    async def generate_reply(stream: LiveStream):
+        reply_parts: list[str] = []
+        tokens = coalesce_tokens(
+            llm.stream(system_prompt, user_input, history=history),
+            flush_interval_ms=settings.sse_flush_interval_ms,
+            flush_bytes=settings.sse_flush_bytes,
+        )
+        completed = False
+        # The turn's commit, started at most once. Once started it runs to
+        # the end (see turn_writer), so the rest of persistence must follow.
+        commit: Optional[asyncio.Task] = None
+        stored_reply, stored_truncated = "", False
 
-            # FINAL EVENT YIELDED IMMEDIATELY 
-            yield {
-                "event": "done",
-                "data": json.dumps({
-                    "conversation_id": str(conversation_id_uuid), # <-- RETURN THE ID TO THE FRONTEND
-                    "is_new": is_new_conversation,
-                    "memories": memories,
-                })
-            }
-            
-            # STORAGE PHASE (DECOUPLED)
-            background_tasks.add_task(
-                persist_chat_data,
+        def start_commit(truncated: bool) -> asyncio.Task:
+            nonlocal commit, stored_reply, stored_truncated
+            stored_reply, stored_truncated = "".join(reply_parts).strip(), truncated
+            commit = asyncio.create_task(commit_chat_turn(
+                user_id_uuid,
+                conversation_id_uuid,
+                user_input,
+                stored_reply,
+                truncated=truncated,
+                new_conversation=is_new_conversation,
+            ))
+            return commit
+
+        async def finish_turn():
+            messages = await commit
+            await persist_after_commit(
                 user_id_uuid,
                 conversation_id_uuid,
                 user_id_str,
                 user_input,
-                full_reply.strip()
+                stored_reply,
+                messages,
+                truncated=stored_truncated,
+                new_conversation=is_new_conversation,
             )
-
-            if is_new_conversation:
-                background_tasks.add_task(
-                    generate_and_store_title,
+            if messages is not None and is_new_conversation:
+                await generate_and_store_title(
                     conversation_id_uuid,
                     user_id_uuid,
                     user_input
                 )
 
+        try:
+            # STREAMING PHASE
+            async for chunk in tokens:
+                reply_parts.append(chunk)
+                stream.publish("message", {"chunk": chunk})
+            completed = True
 
+            if is_new_conversation:
+                # The conversation row is inserted with this first turn: it
+                # must be committed before the client can send a follow-up.
+                # Only the commit is awaited; the rest runs after "done".
+                if await asyncio.shield(start_commit(truncated=False)) is None:
+                    raise RuntimeError("The conversation could not be saved.")
 
+            # FINAL EVENT YIELDED IMMEDIATELY 
+            stream.publish("done", {
+                "conversation_id": str(conversation_id_uuid), # <-- RETURN THE ID TO THE FRONTEND
+                "is_new": is_new_conversation,
+                "memories": memories,
+                "stream_id": stream.stream_id,
+            })
 
         except Exception as e:
-            yield {
-                "event": "error",
-                "data": json.dumps({"error": str(e)})
-            }       
+            completed = True
+            stream.publish("error", {"error": str(e)})
+
+        finally:
+            # Cancelled when nobody has been listening for the resume grace
+            # period: stop the Bedrock stream right away.
+            await tokens.aclose()
+
+            # STORAGE PHASE. An empty partial reply is not stored (an empty
+            # assistant turn would break the next prompt). Detached, so a
+            # cancelled stream gets its "truncated" event without waiting on
+            # persistence and the title LLM call.
+            full_reply = "".join(reply_parts).strip()
+            if commit is None and (completed or full_reply):
+                start_commit(truncated=not completed)
+            if commit is not None:
+                _detach(finish_turn())
+
+    stream = await stream_hub.start(user_id_str, generate_reply)
+    return EventSourceResponse(_sse_events(request, stream_hub.subscribe(stream)))
 
-    return EventSourceResponse(event_generator())
+
+async def _resume_stream(request: Request, last_event_id: str, user_id_str: str):
+    """
+    Replays events after Last-Event-ID, then follows the live generation.
+    """
+    try:
+        stream_id, after_seq = parse_event_id(last_event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID.")
+
+    stream = stream_hub.get(stream_id)
+    if stream:
+        if stream.user_id != user_id_str:
+            raise HTTPException(status_code=404, detail="Stream not found or expired.")
+        if not stream.can_replay_from(after_seq):
+            raise HTTPException(status_code=410, detail="Stream history no longer available.")
+        events = stream_hub.subscribe(stream, after_seq)
+    else:
+        # Produced by another worker (or this one before a restart)
+        if await stream_hub.owner_of(stream_id) != user_id_str:
+            raise HTTPException(status_code=404, detail="Stream not found or expired.")
+        events = stream_hub.replay_remote(stream_id, after_seq)
+
+    return EventSourceResponse(_sse_events(request, events))
+
+
+async def _sse_events(request: Request, events):
+    """
+    Forwards hub events to one SSE client. Leaving early only detaches
+    this subscriber; the hub decides when generation is cancelled.
+    """
+    last_disconnect_check = time.monotonic()
+    try:
+        async for event in events:
+            now = time.monotonic()
+            if now - last_disconnect_check >= DISCONNECT_POLL_SECONDS:
+                last_disconnect_check = now
+                if await request.is_disconnected():
+                    break
+            yield event
+    finally:
+        await events.aclose()
 
 # app/api/v1/chat_routes.py (NEW FUNCTION)
 
@@ -140,60 +249,93 @@ async def chat_stream(
 # --- BACKGROUND PERSISTENCE FUNCTION ---
 # This function is now responsible for COMMITTING the transaction.
 
-async def persist_chat_data(
+async def commit_chat_turn(
+    user_id_uuid: UUID,
+    conversation_id: UUID,
+    user_input: str,
+    full_reply: str,
+    truncated: bool = False,
+    new_conversation: bool = False,
+) -> Optional[List[Dict]]:
+    """
+    Commits the turn to the DB (group commit with other requests' turns).
+    `new_conversation`: this is the first turn, the conversation row is
+    inserted with it. Returns both messages with their ids, or None if the
+    turn is not in the DB.
+    """
+    try:
+        return await turn_writer.submit(
+            user_id_uuid,
+            conversation_id,
+            user_input,
+            full_reply,
+            truncated=truncated,
+            new_conversation=new_conversation,
+        )
+    except Exception:
+        # The turn writer has already retried
+        logger.exception("Background DB storage failed. Conversation ID: %s", conversation_id)
+        return None
+
+
+async def persist_after_commit(
     user_id_uuid: UUID,
     conversation_id: UUID,
     user_id_str: str,
     user_input: str,
-    full_reply: str
+    full_reply: str,
+    messages: Optional[List[Dict]],
+    truncated: bool = False,
+    new_conversation: bool = False,
 ):
-    """Performs all persistence (DB History and mem0) in the background."""
+    """
+    Everything that follows the DB commit, in the background. `messages`
+    is what commit_chat_turn returned (None: the commit failed).
+    A new conversation whose first turn failed does not exist: nothing
+    else is stored for it.
+    """
+    if messages is None and new_conversation:
+        return
 
     # -----------------------------
-    # 1. DATABASE PERSISTENCE
+    # 1. CACHES OF THE COMMITTED TURN
     # -----------------------------
-    try:
-        async with AsyncSessionLocal() as session:
-            await add_message_to_history(
-                session,
-                user_id_uuid,
-                conversation_id,
-                "user",
-                user_input,
-            )
-            await add_message_to_history(
-                session,
-                user_id_uuid,
-                conversation_id,
-                "assistant",
-                full_reply,
-            )
-            await session.commit()
-
-    except Exception as e:
-        # No rollback outside session context
-        print(
-            f"ERROR: Background DB storage failed. "
-            f"Conversation ID: {conversation_id} Error: {e}"
-        )
+    if messages is not None:
+        try:
+            # Write-through: the next turn reads its history from Redis
+            await history_cache.append(conversation_id, messages)
+            # The conversation moved to (or appeared at) the top of the sidebar
+            await CacheManager.invalidate_tags(conversations_tag(user_id_uuid))
+        except Exception:
+            logger.warning("Conversation caches not updated for %s", conversation_id, exc_info=True)
 
     # -----------------------------
-    # 2. MEM0 PERSISTENCE
+    # 2. MEM0 PERSISTENCE (write-behind: spooled now, batched to mem0 later)
     # -----------------------------
     try:
-        mem0.add(
+        await memory_writer.enqueue(
+            user_id_str,
+            str(conversation_id),
             [
                 {"role": "user", "content": user_input},
                 {"role": "assistant", "content": full_reply},
             ],
-            user_id=user_id_str,
             metadata={
                 "app_id": "awaren_ai",
                 "conversation_id": str(conversation_id),
+                "truncated": truncated,
             },
         )
-    except Exception as e:
-        print(f"ERROR: Background mem0 storage failed. Error: {e}")
+    except Exception:
+        logger.exception("Background mem0 storage failed. Conversation ID: %s", conversation_id)
+
+    # -----------------------------
+    # 3. INSIGHTS ARE NOW STALE (recomputed only if the memories differ)
+    # -----------------------------
+    try:
+        await mark_insights_dirty(user_id_str)
+    except Exception:
+        logger.warning("Insights not marked dirty for %s", user_id_str, exc_info=True)
 
 
 # NOTE: Due to how BackgroundTasks and dependencies work, it's often cleaner to
@@ -1,60 +1,115 @@
 # app/api/v1/conversation_routes.py (UPDATED with new history endpoint)
 import logger
 from app.db.db import AsyncSessionLocal
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config import auth 
 from app.db.db import get_session
-from app.services.conversations.conversations_service import get_conversations_by_user, get_last_n_messages, get_conversation_by_id, delete_conversation_by_id
-from typing import List, Dict
+from app.config.settings import settings
+from app.services.conversations.conversations_service import (
+    InvalidCursor,
+    decode_conversation_cursor,
+    decode_message_cursor,
+    delete_conversation_by_id,
+    encode_conversation_cursor,
+    encode_message_cursor,
+    get_conversation_by_id,
+    get_conversations_page,
+    get_messages_page,
+)
+from typing import List, Dict, Optional
 from uuid import UUID
 from app.models.chat import ChatHistory
-from app.services.cache.redis_manager import CacheManager
+from app.services.cache.redis_manager import CacheManager, cached
+from app.services.cache.tags import conversations_tag, user_tag
+from app.services.conversations.history_cache import history_cache
+from app.services.export.account_export import iter_conversation_ndjson
 
 router = APIRouter(prefix="/conversations")
 
+
+@cached(
+    key=lambda session, user_id, limit: f"conversations:first_page:{user_id}:{limit}",
+    tags=lambda session, user_id, limit: [user_tag(user_id), conversations_tag(user_id)],
+    expire=settings.conversation_list_cache_seconds,
+)
+async def _first_page(session: AsyncSession, user_id: UUID, limit: int) -> Dict:
+    return await _load_page(session, user_id, limit)
+
+
+async def _load_page(session: AsyncSession, user_id: UUID, limit: int, before=None) -> Dict:
+    items, next_key = await get_conversations_page(session, user_id, limit=limit, before=before)
+    return {"items": items, "next": encode_conversation_cursor(next_key) if next_key else None}
+
+
 # -----------------------------
 # CONVERSATION LIST (SIDEBAR)
 # -----------------------------
 @router.get("", response_model=list[dict])
 async def list_conversations(
+    response: Response,
+    limit: int = Query(30, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
     session: AsyncSession = Depends(get_session),
     current_user=Depends(auth.get_current_user),
 ):
     """
-    Returns a list of all conversations for the authenticated user (sidebar).
-    Cached with a short TTL for fast UX.
+    The user's conversations, most recent activity first (sidebar), one page
+    at a time. The next page's cursor is in the X-Next-Cursor header.
+    The first page is cached until a turn is persisted or a conversation is
+    created, titled or deleted.
     """
     user_id: UUID = current_user.user_id
-    user_id_str = str(user_id)
 
-    # 2. DB = source of truth
-    conversations = await get_conversations_by_user(session, user_id)
+    if cursor:
+        try:
+            before = decode_conversation_cursor(cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page = await _load_page(session, user_id, limit, before)
+    elif settings.conversation_list_cache_seconds:
+        page = await _first_page(session, user_id, limit)
+    else:
+        page = await _load_page(session, user_id, limit)
 
-    formatted = [
-        {
-            "id": str(c.id),
-            "title": c.title,
-            "created_at": c.created_at.isoformat(),
-        }
-        for c in conversations
-    ]
+    if page["next"]:
+        response.headers["X-Next-Cursor"] = page["next"]
+    return page["items"]
 
-    return formatted
 
 # --- 2. Message History Retrieval Endpoint (GET /api/v1/conversations/{id}/messages) ---
 @router.get("/{conversation_id}/messages", response_model=List[Dict])
 async def get_conversation_messages(
     conversation_id: UUID, 
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[str] = Query(None),
+    after: Optional[str] = Query(None),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
     session: AsyncSession = Depends(get_session), 
     current_user = Depends(auth.get_current_user)
 ):
     """
-    Retrieves the full chronological message history for a specific conversation.
+    Message history of a conversation, oldest first, one page at a time.
+    Without a cursor: the latest `limit` messages.
+
+    Headers:
+    - X-Before-Cursor: pass as ?before= for older messages (absent when
+      this page starts at the first message)
+    - X-After-Cursor: pass as ?after= for newer messages, to continue
+      forward or to poll for new ones
+
+    ?format=ndjson streams the whole conversation instead (one message per
+    line, server-side cursor; paging parameters are ignored).
     """
     user_id_uuid: UUID = current_user.user_id
 
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both.")
+
     # 1. Validation: Ensure the conversation exists and belongs to the user
     conversation = await get_conversation_by_id(session, conversation_id, user_id_uuid)
     
@@ -62,20 +117,40 @@ async def get_conversation_messages(
         # 404 Not Found is appropriate if the conversation doesn't exist or doesn't belong to the user
         raise HTTPException(status_code=404, detail="Conversation not found or access denied.")
 
-    # 2. Retrieval: Fetch all messages for this conversation.
-    # We call get_last_n_messages but set n=None or a very large number to get everything.
-    # NOTE: We need to modify get_last_n_messages in history_crud.py to handle retrieving ALL messages.
-    
-    # Assuming get_last_n_messages is updated to return all if n is large (e.g., 99999)
-    # OR, better yet, we create a new function for ALL history.
-    
-    # For now, we reuse the existing function with a large limit:
-    all_messages = await get_last_n_messages(session, conversation_id, n=99999)
-    
-    # The get_last_n_messages function already returns data in the desired format:
-    # [{'role': 'user', 'content': '...'}, {'role': 'assistant', 'content': '...'}, ...]
-    
-    return all_messages
+    if output == "ndjson":
+        return StreamingResponse(
+            iter_conversation_ndjson(conversation_id),
+            media_type="application/x-ndjson",
+        )
+
+    # 2. Retrieval: one keyset page on (conversation_id, timestamp, id)
+    try:
+        messages, has_more = await get_messages_page(
+            session,
+            conversation_id,
+            limit=limit,
+            before=decode_message_cursor(before) if before else None,
+            after=decode_message_cursor(after) if after else None,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if messages:
+        # Paging forward, the `after` message itself is older than this page
+        older_exist = has_more if after is None else True
+        if older_exist:
+            first = messages[0]
+            response.headers["X-Before-Cursor"] = encode_message_cursor(
+                (datetime.fromisoformat(first["timestamp"]), first["id"])
+            )
+        last = messages[-1]
+        response.headers["X-After-Cursor"] = encode_message_cursor(
+            (datetime.fromisoformat(last["timestamp"]), last["id"])
+        )
+    elif after:
+        response.headers["X-After-Cursor"] = after
+
+    return messages
 
 # app/services/history_crud.py (NEW FUNCTION FOR FULL HISTORY)
 
@@ -98,4 +173,7 @@ async def delete_conversation_messages(
         # 404 Not Found is appropriate if the conversation doesn't exist or doesn't belong to the user
         raise HTTPException(status_code=404, detail="Conversation not found or access denied.")
 
+    await CacheManager.invalidate_tags(conversations_tag(user_id_uuid))
+    await history_cache.drop(conversation_id)
+
 # @router.post("/{conversation_id}/generate-title")
@@ -0,0 +1,26 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from app.config import auth
+from app.services.export.account_export import iter_account_ndjson
+
+router = APIRouter(prefix="/export")
+
+
+# -----------------------------
+# FULL ACCOUNT EXPORT (NDJSON)
+# -----------------------------
+@router.get("")
+async def export_account(current_user=Depends(auth.get_current_user)):
+    """
+    Conversations, their messages and the user's memories as NDJSON, one
+    record per line, streamed (see services/export/account_export.py).
+    """
+    filename = f"awaren-export-{date.today().isoformat()}.ndjson"
+    return StreamingResponse(
+        iter_account_ndjson(current_user.user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
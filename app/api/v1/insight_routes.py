@@ -1,14 +1,68 @@
+import json
+import time
+
 from fastapi import APIRouter, Depends, Query
+from sse_starlette.sse import EventSourceResponse
 
 from app.config import auth
 from app.services.insights.insight_service import InsightService
-from app.services.cache.redis_manager import CacheManager
+from app.services.cache.redis_manager import (
+    CacheManager,
+    envelope_is_current,
+    envelope_is_fresh,
+    make_envelope,
+    tag_versions,
+)
+from app.services.insights.insight_cache import (
+    insight_key,
+    insight_tags,
+    load_all_insights,
+    memories_changed_at,
+    precompute_worker_alive,
+    request_precompute,
+)
+from app.config.settings import settings
 router = APIRouter(prefix="/insights")
 
 service = InsightService()
 
 
-DEFAULT_TTL = 3600  # 1 hour
+# Upper bound only: insights are revalidated as soon as memories change
+MAX_AGE = settings.insight_max_age_seconds
+
+
+async def _cached_insight(kind: str, user_id: str, compute, refresh: bool):
+    # Normally a pure cache read: the precompute worker keeps these warm and
+    # a stale hit only bumps the user in its queue. Without a running worker
+    # stale values are refreshed here in the background. A miss (or
+    # ?refresh=true) is computed on demand, once per key across tabs,
+    # retries and workers.
+    revalidate = "background"
+    if await precompute_worker_alive():
+        revalidate = lambda: request_precompute(user_id, "interactive")
+
+    record = await CacheManager.get_or_compute(
+        insight_key(kind, user_id),
+        lambda previous: compute(user_id=user_id, previous=previous),
+        expire=MAX_AGE,
+        force=refresh,
+        valid_after=await memories_changed_at(user_id),
+        revalidate=revalidate,
+        tags=insight_tags(user_id),
+    )
+    return record["result"]
+
+
+# -----------------------------
+# ALL INSIGHTS (one round trip for the insights screen)
+# -----------------------------
+@router.get("/all")
+async def get_all_insights(
+    refresh: bool = Query(False),
+    current_user=Depends(auth.get_current_user),
+):
+    user_id = str(current_user.user_id)
+    return await load_all_insights(service, user_id, refresh=refresh)
 
 
 # -----------------------------
@@ -20,17 +74,7 @@ async def get_hero_insight(
     current_user=Depends(auth.get_current_user),
 ):
     user_id = str(current_user.user_id)
-    cache_key = f"insights:hero:{user_id}"
-
-    if not refresh:
-        cached = await CacheManager.get(cache_key)
-        if cached:
-            return cached
-
-    data = await service.get_hero_insight(user_id=user_id)
-
-    await CacheManager.set(cache_key, data, expire=DEFAULT_TTL)
-    return data
+    return await _cached_insight("hero", user_id, service.get_hero_insight, refresh)
 
 
 # -----------------------------
@@ -42,17 +86,7 @@ async def get_data_insights(
     current_user=Depends(auth.get_current_user),
 ):
     user_id = str(current_user.user_id)
-    cache_key = f"insights:data:{user_id}"
-
-    if not refresh:
-        cached = await CacheManager.get(cache_key)
-        if cached:
-            return cached
-
-    data = await service.get_data_insights(user_id=user_id)
-
-    await CacheManager.set(cache_key, data, expire=DEFAULT_TTL)
-    return data
+    return await _cached_insight("data", user_id, service.get_data_insights, refresh)
 
 
 # -----------------------------
@@ -64,14 +98,55 @@ async def get_deep_insights(
     current_user=Depends(auth.get_current_user),
 ):
     user_id = str(current_user.user_id)
-    cache_key = f"insights:deep:{user_id}"
-
-    if not refresh:
-        cached = await CacheManager.get(cache_key)
-        if cached:
-            return cached
+    return await _cached_insight("deep", user_id, service.explore_deep_insights, refresh)
 
-    data = await service.explore_deep_insights(user_id=user_id)
 
-    await CacheManager.set(cache_key, data, expire=DEFAULT_TTL)
-    return data
\ No newline at end of file
+# -----------------------------
+# DEEP INSIGHTS (progressive SSE)
+# -----------------------------
+@router.get("/explore/stream")
+async def stream_deep_insights(
+    refresh: bool = Query(False),
+    current_user=Depends(auth.get_current_user),
+):
+    """
+    Same content as /explore, sent field by field:
+    "field" events {"key", "value"}, then "done" with the full object.
+    """
+    user_id = str(current_user.user_id)
+    cache_key = insight_key("deep", user_id)
+    valid_after = await memories_changed_at(user_id)
+    tags = await tag_versions(insight_tags(user_id))
+    entry = None if refresh else await CacheManager.get(cache_key)
+    if not envelope_is_current(entry, tags):
+        entry = None
+    return EventSourceResponse(_deep_insight_events(user_id, cache_key, entry, valid_after, tags))
+
+
+async def _deep_insight_events(user_id: str, cache_key: str, entry, valid_after, tags):
+    def _field(key, value):
+        return {"event": "field", "data": json.dumps({"key": key, "value": value})}
+
+    if entry is not None and envelope_is_fresh(entry, valid_after):
+        result = entry["value"]["result"]
+        for key, value in result.items():
+            yield _field(key, value)
+        yield {"event": "done", "data": json.dumps(result)}
+        return
+
+    previous = entry["value"] if entry is not None else None
+    computed_at = time.time()
+    record = None
+    async for item in service.stream_deep_insights(user_id, previous=previous):
+        if "record" in item:
+            record = item["record"]
+        else:
+            yield _field(item["key"], item["value"])
+
+    # Only a completed stream is cached (a disconnect never gets here)
+    await CacheManager.set(
+        cache_key,
+        make_envelope(record, computed_at, MAX_AGE, tags),
+        expire=MAX_AGE + settings.cache_stale_seconds,
+    )
+    yield {"event": "done", "data": json.dumps(record["result"])}
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Query
 import json
-from fastapi import Depends, HTTPException, Request
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -9,9 +11,12 @@ from app.schema import chat_schema
 from app.services.memory import mem0_service
 from app.services.chat.chat_service import analyze_life_patterns
 from app.services.cache.redis_manager import CacheManager
+from app.services.cache.tags import invalidate_user, memory_set_tag
+from app.services.memory.memory_listing import InvalidCursor, iter_memories_ndjson, load_memory_page
 
 router = APIRouter(prefix="/memory")
 
+
 # --- Endpoint for UI to preview relevant memories (non-streaming) ---
 @router.get("/relevant", response_model=list[chat_schema.MemoryItem])
 async def get_relevant_memories(
@@ -21,7 +26,7 @@ async def get_relevant_memories(
     user_id_str = str(current_user.user_id)
     filters = {"AND": [{"user_id": user_id_str}, {"app_id": "health_bot"}]}
 
-    memories = mem0_service.mem0.search(
+    memories = await mem0_service.mem0.asearch(
         q,
         user_id=user_id_str,
         limit=10,
@@ -40,47 +45,39 @@ async def get_relevant_memories(
 
 @router.get("/all", response_model=list[chat_schema.MemoryItem])
 async def get_all_memories(
+    response: Response,
     refresh: bool = Query(False),
-    limit: int = 20,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
     current_user=Depends(auth.get_current_user),
 ):
+    """
+    One page of memories, `limit` per page. The next page's cursor is in the
+    X-Next-Cursor header (absent on the last page).
+    ?format=ndjson streams every memory instead, one JSON object per line.
+    """
     user_id = str(current_user.user_id)
-    cache_key = f"memories:all:{user_id}"
-    
-    # 1️⃣ If refresh is requested, KILL the old cache immediately
+
+    if output == "ndjson":
+        return StreamingResponse(
+            iter_memories_ndjson(user_id, category),
+            media_type="application/x-ndjson",
+        )
+
+    # If refresh is requested, KILL every cached page immediately
     if refresh:
-        await CacheManager.delete(cache_key) 
-    else:
-        # Standard flow: return from cache if it exists
-        cached = await CacheManager.get(cache_key)
-        if cached:
-            return cached[:limit]
-
-    # 2️⃣ Source of truth (mem0) - Bypass phase
-    # Note: Ensure Render has AWS credentials to avoid the error you saw
-    memories = mem0_service.mem0.client.get_all(user_id=user_id)
-    
-    out = []
-    for m in memories:
-        # ... (Normalization logic remains the same)
-        raw_categories = m.get("categories", []) or []
-        clean_categories = [
-            cat.split(":")[-1].strip().capitalize() if ":" in cat else cat.capitalize()
-            for cat in raw_categories
-        ]
+        await CacheManager.invalidate_tags(memory_set_tag(user_id))
 
-        out.append({
-            "id": m.get("id"),
-            "memory": m.get("memory") or m.get("content"),
-            "score": m.get("score", 1.0),
-            "categories": clean_categories or ["Fragment"],
-        })
+    try:
+        items, next_cursor = await load_memory_page(user_id, cursor, limit, category)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # 3️⃣ ALWAYS update or clear the cache for future requests
-    # Even if 'out' is empty, we set it so Redis reflects the current empty state
-    await CacheManager.set(cache_key, out, expire=3600)
-    
-    return out[:limit]
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @router.get("/{memory_id}")
 async def get_memory_by_id(
@@ -89,11 +86,13 @@ async def get_memory_by_id(
 ):
     user_id_str = str(current_user.user_id)
 
-    memory = mem0_service.mem0.client.get(
+    memory = await mem0_service.mem0.aget(
         memory_id=memory_id,
+        user_id=user_id_str,
     )
 
-    if not memory:
+    # Also 404 for another user's memory (local ids are guessable)
+    if not memory or memory.get("user_id") != user_id_str:
         raise HTTPException(status_code=404, detail="Memory not found")
 
     # Return exactly what Mem0 returns
@@ -104,14 +103,17 @@ async def delete_all_memories(
     current_user = Depends(auth.get_current_user),
 ):
     user_id_str = str(current_user.user_id)
-    memory = mem0_service.mem0.client.delete_all(
-        user_id='90266b83-0f31-4101-a8fa-bac7aa7588af'
+    memory = await mem0_service.mem0.adelete_all(
+        user_id=user_id_str
         # app_id='health_bot'
     )
 
     if not memory:
         raise HTTPException(status_code=404, detail="Memory not found")
 
+    # Memory list, insights and anything else derived for this user
+    await invalidate_user(user_id_str)
+
     # Return exactly what Mem0 returns
     return memory
 
@@ -0,0 +1,24 @@
+from fastapi import APIRouter
+
+from app.services.memory.write_behind import memory_writer
+from app.services.cache.redis_manager import CacheManager
+from app.services.conversations.history_cache import history_cache
+from app.services.conversations.turn_writer import turn_writer
+
+router = APIRouter(prefix="/metrics")
+
+
+# -----------------------------
+# PROCESS METRICS (per worker)
+# -----------------------------
+@router.get("")
+async def get_metrics():
+    """
+    In-process counters for this worker. No user data.
+    """
+    return {
+        "mem0_write_behind": memory_writer.stats(),
+        "cache": CacheManager.stats(),
+        "history_cache": history_cache.stats(),
+        "turn_writer": turn_writer.stats(),
+    }
@@ -11,10 +11,86 @@ class Settings(BaseSettings):
     google_cloud_project: str = ""
     google_cloud_location: str = ""
     mem0_api_key: str = ""
+    # mem0 SDK is blocking: async calls run on a dedicated pool with timeouts
+    mem0_max_workers: int = 8
+    mem0_timeout_seconds: float = 10.0
+    # Write-behind for mem0.add: batch per user/conversation, spooled to SQLite
+    mem0_write_batch_turns: int = 5
+    mem0_write_flush_seconds: float = 30.0
+    mem0_write_spool_path: str = "data/mem0_spool.sqlite3"
+    # Offline memory engine, used when mem0_api_key is empty
+    local_memory_dir: str = "data/local_memory"
+    local_memory_embedder: str = "hashing"  # or "package.module:factory"
+    local_memory_dim: int = 384
+    # Chat goes ahead without long-term memories if mem0 takes longer than this
+    chat_memory_budget_ms: int = 800
     vertex_model_name: str = "gemini-2.5-flash"
     google_genai_use_vertexai: bool
     aws_region: str ="eu-north-1"
 
+    # Bedrock client pool (shared boto3 clients, see llm/client_registry.py)
+    bedrock_max_pool_connections: int = 50
+    bedrock_connect_timeout: float = 5.0
+    bedrock_read_timeout: float = 60.0
+    # Tokens read ahead of the stream consumer before Bedrock reads pause.
+    # 0 = pull-driven (nothing is read until the consumer asks for it)
+    llm_stream_buffer_size: int = 0
+
+    # SSE token coalescing: flush every N ms or M bytes (first token is immediate).
+    # sse_flush_interval_ms = 0 sends one event per token.
+    sse_flush_interval_ms: int = 40
+    sse_flush_bytes: int = 256
+
+    # Resumable chat streams (Last-Event-ID replay, see chat/stream_hub.py)
+    chat_stream_buffer_events: int = 1000
+    # Generation keeps running this long after the last client detaches.
+    # 0 = cancel as soon as the client disconnects.
+    chat_stream_resume_grace_seconds: float = 10.0
+    chat_stream_retention_seconds: int = 300
+
+    # Redis (CacheManager). Use rediss:// for TLS providers such as Upstash.
+    redis_url: str = "redis://localhost:6379/0"
+    redis_max_connections: int = 50
+    redis_socket_timeout: float = 2.0
+    redis_connect_timeout: float = 2.0
+    redis_health_check_interval: int = 30
+    # In-process L1 in front of Redis; 0 entries disables it
+    cache_l1_max_entries: int = 10000
+    cache_l1_ttl_seconds: float = 30.0
+    cache_invalidation_channel: str = "cache:invalidate"
+    # Stored value format (see cache/serializer.py): json | orjson | msgpack,
+    # compressed with none | zlib | zstd from this size up
+    cache_format: str = "orjson"
+    cache_compression: str = "zstd"
+    cache_compress_min_bytes: int = 1024
+    # get_or_compute: expired values are served (and refreshed in the
+    # background) for this long; one worker recomputes a key at a time
+    cache_stale_seconds: int = 86400
+    cache_lock_seconds: int = 30
+    cache_lock_wait_seconds: float = 15.0
+    # Cached sidebar first page; 0 disables. Writes invalidate it, so this
+    # is only an upper bound
+    conversation_list_cache_seconds: int = 300
+    # Chat turns are written in group commits (conversations/turn_writer.py):
+    # a batch closes this long after its first turn, or when full
+    chat_persist_batch_turns: int = 100
+    chat_persist_flush_ms: float = 5.0
+    chat_persist_max_attempts: int = 3
+    # Last N messages per conversation kept in Redis (chat history reads)
+    chat_history_cache_messages: int = 50
+    chat_history_cache_ttl_seconds: int = 86400
+    # Tag version counters (CacheManager.invalidate_tags) must outlive
+    # every entry tagged with them
+    cache_tag_ttl_seconds: int = 30 * 86400
+    # Insights are recomputed when memories change; this is only the
+    # upper bound for an unchanged user
+    insight_max_age_seconds: int = 86400
+    # Precompute worker (python -m app.services.insights.precompute)
+    insight_precompute_concurrency: int = 4
+    insight_precompute_debounce_seconds: int = 60
+    insight_precompute_schedule_seconds: int = 1800
+    insight_active_window_seconds: int = 7 * 86400
+
     class Config:
         env_file = ".env"
 
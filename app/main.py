@@ -1,6 +1,11 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.db.db import engine, Base
+from app.services.llm.client_registry import bedrock_clients
+from app.services.memory.write_behind import memory_writer
+from app.services.conversations.turn_writer import turn_writer
+from app.services.cache.redis_manager import close_redis, start_invalidation_listener
 import os
 import tempfile
 # routes
@@ -9,6 +14,8 @@ from app.api.v1.user_routes import router as user_routes
 from app.api.v1.memory_routes import router as memory_routes
 from app.api.v1.conversation_routes import router as conversation_routes
 from app.api.v1.insight_routes import router as insight_routes
+from app.api.v1.metrics_routes import router as metrics_routes
+from app.api.v1.export_routes import router as export_routes
 # Create DB tables on startup (for demo; in prod use migrations)
 async def init_db():
     async with engine.begin() as conn:
@@ -30,16 +37,41 @@ app.add_middleware(
     allow_credentials=False,  # strict: disallow cookies / auth headers from browsers
     allow_methods=["GET", "POST", "DELETE", "OPTIONS"],  # explicit minimal allowed methods
     allow_headers=["*"],  # only the headers you actually need
+    expose_headers=["X-Next-Cursor", "X-Before-Cursor", "X-After-Cursor"],  # pagination cursors readable by browsers
 )
 # ----------------------------
 
+# Build pooled Bedrock clients before the first request (blocking boto3 setup)
+async def warm_up_llm_clients():
+    try:
+        await asyncio.to_thread(bedrock_clients.warm_up)
+    except Exception as e:
+        # Not fatal: clients are built lazily on first use
+        print(f"WARNING: Bedrock client warm-up failed: {e}")
+
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    await warm_up_llm_clients()
+    # Replays any mem0 turns spooled before the last shutdown / crash
+    await memory_writer.start()
+    # Group-commit flusher for chat turns
+    turn_writer.start()
+    # Keeps this worker's L1 cache coherent with writes from other workers
+    start_invalidation_listener()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Commits the chat turns still queued
+    await turn_writer.stop()
+    await memory_writer.stop()
+    await close_redis()
 
 app.include_router(chat_routes, prefix="/api/v1")
 app.include_router(user_routes, prefix="/api/v1")
 app.include_router(memory_routes, prefix="/api/v1")
 app.include_router(conversation_routes, prefix="/api/v1")
 app.include_router(insight_routes, prefix="/api/v1")
+app.include_router(metrics_routes, prefix="/api/v1")
+app.include_router(export_routes, prefix="/api/v1")
 
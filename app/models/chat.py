@@ -2,7 +2,7 @@
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Index, false, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -12,6 +12,16 @@ from app.db.db import Base
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Sidebar: newest activity first, served from the index alone
+        Index(
+            "ix_conversations_user_last_message_at",
+            "user_id",
+            text("last_message_at DESC"),
+            text("id DESC"),
+            postgresql_include=["title", "created_at", "message_count"],
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     user_id = Column(
@@ -22,6 +32,12 @@ class Conversation(Base):
     )
     title = Column(String(255), nullable=True) # Will be generated later
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    # Denormalised from chat_history, updated with every persisted turn
+    last_message_at = Column(
+        DateTime(timezone=True), default=datetime.utcnow, server_default=func.now(), nullable=False
+    )
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relationship to ChatHistory
     messages = relationship("ChatHistory", back_populates="conversation", order_by="ChatHistory.timestamp")
@@ -29,6 +45,11 @@ class Conversation(Base):
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
+    __table_args__ = (
+        # Serves "messages of a conversation in time order" and keyset
+        # pages on (timestamp, id) with one index range scan
+        Index("ix_chat_history_conversation_timestamp_id", "conversation_id", "timestamp", "id"),
+    )
 
     # Primary Key
     id = Column(Integer, primary_key=True, index=True)
@@ -50,6 +71,9 @@ class ChatHistory(Base):
     
     # Timestamp: Used for chronological ordering
     timestamp = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+
+    # True when the reply was cut short (client disconnected mid-stream)
+    truncated = Column(Boolean, nullable=False, default=False, server_default=false())
     
     # Optional: Relationship back to the User model, if defined
     # user = relationship("User", back_populates="chat_messages") 
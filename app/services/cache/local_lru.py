@@ -0,0 +1,91 @@
+"""
+L1 cache: per-process LRU with TTL, in front of Redis (CacheManager).
+
+Values are the decoded objects, returned as-is on a hit (no JSON work), so
+callers must treat cached values as read-only.
+
+Hit/miss counters are kept per key namespace: the key without its last
+segment ("insights:hero:<uid>" -> "insights:hero").
+"""
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_MISSING = object()
+
+
+def namespace_of(key: str) -> str:
+    head, sep, _ = key.rpartition(":")
+    return head if sep else key
+
+
+class LocalLRU:
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, value)
+        self.evictions = 0
+        # Bumped by every invalidation. A Redis read that started before an
+        # invalidation must not repopulate L1 with what it fetched.
+        self.generation = 0
+        # namespace -> {"l1_hits", "l2_hits", "misses"}
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"l1_hits": 0, "l2_hits": 0, "misses": 0}
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key: str) -> Any:
+        """Returns the value or _MISSING. Does not count (see record)."""
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None):
+        if not self.enabled or (generation is not None and generation != self.generation):
+            return
+        ttl = self.ttl_seconds if ttl is None else min(ttl, self.ttl_seconds)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, keys: Iterable[str]):
+        self.generation += 1
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self):
+        self.generation += 1
+        self._data.clear()
+
+    # ------------------------------
+    # Metrics
+    # ------------------------------
+    def record(self, key: str, outcome: str):
+        """outcome: "l1_hits" | "l2_hits" | "misses"."""
+        self._counters[namespace_of(key)][outcome] += 1
+
+    def stats(self) -> Dict:
+        namespaces = {}
+        for ns, c in sorted(self._counters.items()):
+            total = c["l1_hits"] + c["l2_hits"] + c["misses"]
+            namespaces[ns] = {
+                **c,
+                "l1_hit_ratio": round(c["l1_hits"] / total, 3) if total else 0.0,
+                "hit_ratio": round((c["l1_hits"] + c["l2_hits"]) / total, 3) if total else 0.0,
+            }
+        return {
+            "l1_entries": len(self._data),
+            "l1_evictions": self.evictions,
+            "namespaces": namespaces,
+        }
@@ -0,0 +1,147 @@
+"""
+Byte format of values stored by CacheManager.
+
+Every value is written as a small header followed by the payload:
+
+    0x00 | version | format | compression | payload
+
+- format:       json, orjson or msgpack (how the object became bytes)
+- compression:  none, zlib or zstd (applied only above `compress_min_bytes`)
+
+The reader dispatches on the header, not on the current settings, so the
+format or compression can change without flushing Redis: old entries are
+still read and get rewritten in the new format as they expire. Plain JSON
+text (written before this header existed) never starts with 0x00 and is
+read as legacy JSON. An entry with an unknown version or codec (e.g.
+written by a newer deploy) is treated as a miss.
+
+orjson, msgpack and zstandard are optional; a configured codec that is not
+installed falls back to json / zlib.
+"""
+import json
+import zlib
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+try:
+    import msgpack
+except Exception:
+    msgpack = None
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+MAGIC = 0x00
+VERSION = 1
+
+
+class UnreadableEntry(ValueError):
+    """Bytes this version cannot decode (unknown header, corrupt payload)."""
+
+
+# -----------------------------
+# FORMATS (object <-> bytes)
+# -----------------------------
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    return json.loads(data)
+
+
+def _formats() -> Dict[str, Tuple[int, Callable, Callable]]:
+    formats = {"json": (1, _json_dumps, _json_loads)}
+    if orjson is not None:
+        formats["orjson"] = (
+            2,
+            lambda value: orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS),
+            orjson.loads,
+        )
+    if msgpack is not None:
+        formats["msgpack"] = (
+            3,
+            lambda value: msgpack.packb(value, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+        )
+    return formats
+
+
+def _compressions(zlib_level: int, zstd_level: int) -> Dict[str, Tuple[int, Callable, Callable]]:
+    compressions = {
+        "none": (0, lambda data: data, lambda data: data),
+        "zlib": (1, lambda data: zlib.compress(data, zlib_level), zlib.decompress),
+    }
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=zstd_level)
+        decompressor = zstandard.ZstdDecompressor()
+        compressions["zstd"] = (2, compressor.compress, decompressor.decompress)
+    return compressions
+
+
+# JSON text never starts with a NUL byte
+def is_legacy(data: bytes) -> bool:
+    return not data or data[0] != MAGIC
+
+
+class CacheSerializer:
+    def __init__(
+        self,
+        format: str = "orjson",
+        compression: str = "zstd",
+        compress_min_bytes: int = 1024,
+        zlib_level: int = 6,
+        zstd_level: int = 3,
+    ):
+        formats = _formats()
+        compressions = _compressions(zlib_level, zstd_level)
+
+        if format not in formats:
+            print(f"WARNING: cache format {format!r} unavailable; using json")
+            format = "json"
+        if compression not in compressions:
+            fallback = "zlib" if compression == "zstd" else "none"
+            print(f"WARNING: cache compression {compression!r} unavailable; using {fallback}")
+            compression = fallback
+
+        self.format = format
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self._format_id, self._dumps, _ = formats[format]
+        self._compression_id, self._compress, _ = compressions[compression]
+
+        # Readers for everything installed, whatever is configured for writing
+        self._loads = {fid: loads for fid, _, loads in formats.values()}
+        self._decompress = {cid: decompress for cid, _, decompress in compressions.values()}
+
+    def encode(self, value: Any) -> bytes:
+        payload = self._dumps(value)
+        compression_id = 0
+        if self._compression_id and len(payload) >= self.compress_min_bytes:
+            compressed = self._compress(payload)
+            if len(compressed) < len(payload):
+                payload, compression_id = compressed, self._compression_id
+        return bytes((MAGIC, VERSION, self._format_id, compression_id)) + payload
+
+    def decode(self, data: bytes) -> Any:
+        if is_legacy(data):
+            try:
+                return json.loads(data)
+            except ValueError as e:
+                raise UnreadableEntry(f"corrupt legacy entry: {e}") from e
+        if len(data) < 4 or data[1] != VERSION:
+            raise UnreadableEntry(f"unknown cache entry version {data[1:2]!r}")
+        loads = self._loads.get(data[2])
+        decompress = self._decompress.get(data[3])
+        if loads is None or decompress is None:
+            raise UnreadableEntry(f"unsupported cache codec {data[2]}/{data[3]}")
+        try:
+            return loads(decompress(data[4:]))
+        except Exception as e:
+            raise UnreadableEntry(f"corrupt cache entry: {e!r}") from e
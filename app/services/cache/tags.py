@@ -0,0 +1,34 @@
+"""
+Cache tags (see CacheManager.invalidate_tags).
+
+- user:           everything cached for a user
+- conversations:  the user's conversation list (sidebar)
+- memories:       the user's memory set (/memory/all pages)
+
+Insights carry the user tag only: memory writes make them stale through
+insight_cache's change marker (served while recomputed), while a tag
+invalidation is a hard miss.
+"""
+from typing import Union
+from uuid import UUID
+
+from app.services.cache.redis_manager import CacheManager
+
+Id = Union[str, UUID]
+
+
+def user_tag(user_id: Id) -> str:
+    return f"user:{user_id}"
+
+
+def conversations_tag(user_id: Id) -> str:
+    return f"conversations:{user_id}"
+
+
+def memory_set_tag(user_id: Id) -> str:
+    return f"memories:{user_id}"
+
+
+async def invalidate_user(user_id: Id):
+    """Everything cached for the user, in one round trip."""
+    await CacheManager.invalidate_tags(user_tag(user_id))
@@ -1,21 +1,12 @@
-import asyncio
 import json
 from typing import AsyncGenerator, List, Dict
 from app.services.memory.mem0_service import mem0
 from app.config.settings import settings
-# Swapping to AWS Bedrock
-from langchain_aws import ChatBedrock
-from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain_core.callbacks import AsyncCallbackHandler
+# Swapping to AWS Bedrock (pooled clients, see llm/client_registry.py)
+from app.services.llm.client_registry import bedrock_clients
+from app.services.llm.bed_rock import BedrockLLM
 
-class QueueCallbackHandler(AsyncCallbackHandler):
-    def __init__(self, queue: asyncio.Queue):
-        self.queue = queue
-
-    async def on_llm_new_token(self, token, **kwargs) -> None:
-        if isinstance(token, list):
-            token = "".join(part.get("text", "") for part in token)
-        await self.queue.put(str(token))
+_chat_llm = BedrockLLM(model_id="amazon.nova-lite-v1:0", temperature=0.4)
 
 
 async def stream_generate(
@@ -23,51 +14,15 @@ async def stream_generate(
     user_input: str,
     history: List[Dict] = None,
 ) -> AsyncGenerator[str, None]:
-    queue: asyncio.Queue[str | None] = asyncio.Queue()
-    callback = QueueCallbackHandler(queue)
-
-    llm = ChatBedrock(
-        model_id="amazon.nova-lite-v1:0", 
-        streaming=True,
-        callbacks=[callback],
-        region_name=settings.aws_region, # Ensure region_name is used
-        model_kwargs={"temperature": 0.4}
-    )
-
-    # Nova Lite expects content as a list of dictionaries
-    messages = [SystemMessage(content=[{"text": system_prompt}])]
-    
-    if history:
-        for turn in history:
-            role = turn.get("role")
-            content = turn.get("content")
-            # If content is already a string, wrap it for Nova
-            formatted_content = [{"text": content}] if isinstance(content, str) else content
-            
-            if role == "user":
-                messages.append(HumanMessage(content=formatted_content))
-            elif role == "assistant":
-                messages.append(AIMessage(content=formatted_content))
-    
-    messages.append(HumanMessage(content=[{"text": user_input}]))
-
-    async def run_llm():
-        try:
-            # invoke handles the Converse API formatting requirements
-            await llm.ainvoke(messages)
-        except Exception as e:
-            await queue.put(f"[ERROR] {e}")
-        finally:
-            await queue.put(None)
-
-    task = asyncio.create_task(run_llm())
-    while True:
-        token = await queue.get()
-        if token is None:
-            break
-        yield token
-
-    await task
+    """
+    Kept for existing callers; streams through BedrockLLM.stream.
+    """
+    tokens = _chat_llm.stream(system_prompt, user_input, history=history)
+    try:
+        async for token in tokens:
+            yield token
+    finally:
+        await tokens.aclose()
 
 
 
@@ -78,8 +33,9 @@ async def get_insights_from_nova(user_id: str):
     """
     try:
         # satisfy the Mem0 API requirement for user_id
-        memories =   mem0.client.search(
-            query="What are my recent mindset shifts and goals?",
+        memories = await mem0.asearch(
+            "What are my recent mindset shifts and goals?",
+            user_id=user_id,
             filters={
                 "AND": [
                     {"user_id": user_id}, # This fixes your error
@@ -107,11 +63,7 @@ async def analyze_life_patterns(memory_context: str):
     """
     Deep Behavioral Analysis using Nova Lite
     """
-    llm = ChatBedrock(
-        model_id="amazon.nova-lite-v1:0",
-        region=settings.aws_region,
-        model_kwargs={"temperature": 0.4}
-    )
+    llm = bedrock_clients.get("amazon.nova-lite-v1:0", 0.4, settings.aws_region)
     
     prompt = f"""
     Analyze these user memories to find a deep psychological pattern.
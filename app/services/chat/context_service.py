@@ -0,0 +1,124 @@
+"""
+Chat context assembly (everything the LLM needs before the first token).
+
+Only conversation ownership must happen before the history fetch. The mem0
+search depends on nothing, so it starts first and runs while the DB work
+happens. It gets a latency budget: if it has not answered in time, the
+reply goes ahead without long-term memories.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.services.memory.mem0_service import mem0
+from app.services.conversations.conversations_service import get_conversation_by_id
+from app.services.conversations.history_cache import history_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatContext:
+    conversation_id: UUID
+    is_new_conversation: bool
+    history: List[Dict]
+    memories: List[Dict]
+    memory_timed_out: bool = False
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+async def _search_memories(user_input: str, user_id_str: str) -> List[Dict]:
+    filters = {"AND": [{"user_id": user_id_str}, {"app_id": "awaren_ai"}]}
+    return await mem0.asearch(user_input, user_id=user_id_str, limit=5, filters=filters)
+
+
+def _elapsed_ms(since: float) -> float:
+    return round((time.perf_counter() - since) * 1000, 1)
+
+
+async def assemble_chat_context(
+    session: AsyncSession,
+    user_id: UUID,
+    user_input: str,
+    conversation_id: Optional[UUID] = None,
+    history_limit: int = 10,
+    memory_budget_ms: Optional[int] = None,
+) -> Optional[ChatContext]:
+    """
+    Returns None when `conversation_id` is not found or not owned by the user.
+    Without `conversation_id` a new conversation id is generated; its row is
+    inserted with the first turn (see turn_writer.py), so a new
+    conversation costs no DB round trip here.
+    """
+    budget_ms = settings.chat_memory_budget_ms if memory_budget_ms is None else memory_budget_ms
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    async def _timed_memories():
+        t0 = time.perf_counter()
+        try:
+            return await _search_memories(user_input, str(user_id))
+        finally:
+            timings["memory_ms"] = _elapsed_ms(t0)
+
+    memory_task = asyncio.create_task(_timed_memories())
+    handed_off = False
+    try:
+        # 1. Ownership validation (or a new id)
+        t0 = time.perf_counter()
+        is_new_conversation = False
+        if conversation_id:
+            conversation = await get_conversation_by_id(session, conversation_id, user_id)
+            if not conversation:
+                return None
+        else:
+            conversation_id = uuid4()
+            is_new_conversation = True
+        timings["conversation_ms"] = _elapsed_ms(t0)
+
+        # 2. Short-term history (a brand-new conversation has none).
+        # Redis first; Postgres only on a cache miss.
+        t0 = time.perf_counter()
+        history = []
+        if not is_new_conversation:
+            history = await history_cache.get_recent(session, conversation_id, n=history_limit)
+        timings["history_ms"] = _elapsed_ms(t0)
+        handed_off = True
+    finally:
+        if not handed_off:
+            memory_task.cancel()
+
+    # 3. Long-term memories, within what is left of the budget
+    memories: List[Dict] = []
+    timed_out = False
+    remaining = budget_ms / 1000 - (time.perf_counter() - started)
+    try:
+        memories = await asyncio.wait_for(memory_task, max(remaining, 0)) or []
+    except asyncio.TimeoutError:
+        timed_out = True
+        timings["memory_ms"] = _elapsed_ms(started)
+    except Exception as e:
+        print(f"WARNING: mem0 search skipped: {e!r}")
+
+    timings["total_ms"] = _elapsed_ms(started)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Chat context: %s%s",
+            " ".join(f"{k}={v}" for k, v in timings.items()),
+            " (memory budget exceeded)" if timed_out else "",
+        )
+
+    return ChatContext(
+        conversation_id=conversation_id,
+        is_new_conversation=is_new_conversation,
+        history=history,
+        memories=memories,
+        memory_timed_out=timed_out,
+        timings=timings,
+    )
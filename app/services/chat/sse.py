@@ -0,0 +1,106 @@
+"""
+SSE helpers for token streams.
+Pure asyncio: no FastAPI, no settings imports.
+"""
+import asyncio
+from typing import AsyncGenerator, AsyncIterator
+
+
+async def coalesce_tokens(
+    tokens: AsyncIterator[str],
+    flush_interval_ms: int = 40,
+    flush_bytes: int = 256,
+) -> AsyncGenerator[str, None]:
+    """
+    Groups small tokens into larger chunks for fewer SSE events.
+
+    - The first token is yielded at once (time-to-first-token unchanged).
+    - After that, text is held until `flush_interval_ms` has passed since
+      the window opened, or `flush_bytes` (UTF-8) are pending, whichever
+      comes first. The timer fires even if the model stalls mid-window.
+    - flush_interval_ms <= 0 disables coalescing (one chunk per token).
+
+    One reader task per stream and one timer per window: the consumer wakes
+    once per flush, not once per token. The reader pauses once a full
+    window is pending, so a slow client still applies backpressure.
+    Closing the generator cancels the reader and closes `tokens`.
+    """
+    if flush_interval_ms <= 0:
+        try:
+            async for token in tokens:
+                yield token
+        finally:
+            aclose = getattr(tokens, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        return
+
+    interval = flush_interval_ms / 1000
+    pending: list[str] = []
+    pending_bytes = 0
+    finished = False
+    failure: BaseException | None = None
+
+    has_data = asyncio.Event()   # at least one token pending
+    full = asyncio.Event()       # size threshold reached, or reader finished
+    drained = asyncio.Event()    # consumer took the pending text
+
+    async def _reader():
+        nonlocal pending_bytes, finished, failure
+        try:
+            async for token in tokens:
+                pending.append(token)
+                pending_bytes += len(token.encode("utf-8"))
+                has_data.set()
+                if pending_bytes >= flush_bytes:
+                    drained.clear()
+                    full.set()
+                    await drained.wait()
+        except Exception as e:
+            failure = e
+        finally:
+            finished = True
+            has_data.set()
+            full.set()
+
+    reader = asyncio.create_task(_reader())
+    first = True
+    try:
+        while True:
+            await has_data.wait()
+
+            if not first and not full.is_set():
+                try:
+                    await asyncio.wait_for(full.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+            first = False
+
+            if pending:
+                chunk = "".join(pending)
+                pending.clear()
+                pending_bytes = 0
+                if not finished:
+                    has_data.clear()
+                    full.clear()
+                drained.set()
+                yield chunk
+            elif finished:
+                break
+
+        if failure is not None:
+            raise failure
+
+    finally:
+        if not reader.done():
+            reader.cancel()
+            try:
+                await reader
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(tokens, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except RuntimeError:
+                pass
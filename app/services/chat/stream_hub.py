@@ -0,0 +1,269 @@
+"""
+Resumable chat streams.
+
+Each generation runs in its own producer task, detached from the HTTP
+connection, and publishes sequenced events:
+- into a bounded in-process buffer (live subscribers, same-worker resumes)
+- mirrored in batches to a capped Redis stream through CacheManager
+  (resumes landing on another worker, or after the producer is gone)
+
+SSE event ids are "<stream_id>:<seq>". A client reconnecting with
+Last-Event-ID replays what it missed and then follows the live generation
+instead of starting a second one. Generation is cancelled only once no
+subscriber has been attached for `resume_grace_seconds`.
+"""
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import AsyncGenerator, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.services.cache.redis_manager import CacheManager
+
+TERMINAL_EVENTS = ("done", "error", "truncated")
+
+
+def format_event_id(stream_id: str, seq: int) -> str:
+    return f"{stream_id}:{seq}"
+
+
+def parse_event_id(event_id: str) -> Tuple[str, int]:
+    """Raises ValueError for anything that is not '<uuid>:<int>'."""
+    stream_id, _, seq = event_id.strip().rpartition(":")
+    return str(uuid.UUID(stream_id)), int(seq)
+
+
+def _stream_key(stream_id: str) -> str:
+    return f"chatstream:{stream_id}"
+
+
+def _meta_key(stream_id: str) -> str:
+    return f"chatstream:meta:{stream_id}"
+
+
+class LiveStream:
+    """
+    One generation's event log. Sequence numbers start at 1.
+    """
+
+    def __init__(self, stream_id: str, user_id: str, buffer_size: int):
+        self.stream_id = stream_id
+        self.user_id = user_id
+        self.events: deque = deque(maxlen=buffer_size)  # (seq, event, data)
+        self.last_seq = 0
+        self.finished = False
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._unmirrored: list = []
+        self._changed = asyncio.Event()
+        self._cancel_handle: Optional[asyncio.TimerHandle] = None
+
+    def publish(self, event: str, data: Dict) -> int:
+        if self.finished:
+            return self.last_seq
+
+        self.last_seq += 1
+        entry = (self.last_seq, event, json.dumps(data))
+        self.events.append(entry)
+        self._unmirrored.append(entry)
+        if event in TERMINAL_EVENTS:
+            self.finished = True
+
+        # Wake everyone waiting on the current event, then re-arm
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return self.last_seq
+
+    def can_replay_from(self, after_seq: int) -> bool:
+        if after_seq > self.last_seq:
+            return False
+        oldest = self.events[0][0] if self.events else self.last_seq + 1
+        return after_seq >= oldest - 1
+
+
+class StreamHub:
+    """
+    Process-local registry of live streams (module singleton below).
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 1000,
+        resume_grace_seconds: float = 10.0,
+        retention_seconds: int = 300,
+        remote_poll_seconds: float = 0.25,
+        remote_idle_timeout: float = 30.0,
+    ):
+        self.buffer_size = buffer_size
+        self.resume_grace_seconds = resume_grace_seconds
+        self.retention_seconds = retention_seconds
+        self.remote_poll_seconds = remote_poll_seconds
+        self.remote_idle_timeout = remote_idle_timeout
+        self._streams: Dict[str, LiveStream] = {}
+
+    # ------------------------------
+    # Producer side
+    # ------------------------------
+    async def start(
+        self,
+        user_id: str,
+        producer: Callable[[LiveStream], Awaitable[None]],
+    ) -> LiveStream:
+        """
+        Registers a stream and starts `producer(stream)` in its own task.
+        """
+        stream = LiveStream(str(uuid.uuid4()), user_id, self.buffer_size)
+        self._streams[stream.stream_id] = stream
+
+        try:
+            await CacheManager.set(
+                _meta_key(stream.stream_id),
+                {"user_id": user_id},
+                expire=self.retention_seconds,
+            )
+        except Exception as e:
+            print(f"WARNING: stream meta not mirrored ({stream.stream_id}): {e}")
+
+        stream.task = asyncio.create_task(self._run(stream, producer))
+        return stream
+
+    async def _run(self, stream: LiveStream, producer):
+        mirror = asyncio.create_task(self._mirror(stream))
+        try:
+            await producer(stream)
+        except asyncio.CancelledError:
+            stream.publish("truncated", {"reason": "client_disconnected"})
+        except Exception as e:
+            stream.publish("error", {"error": str(e)})
+        finally:
+            stream.publish("error", {"error": "stream ended unexpectedly"})
+            await mirror
+            loop = asyncio.get_running_loop()
+            loop.call_later(self.retention_seconds, self._streams.pop, stream.stream_id, None)
+
+    async def _mirror(self, stream: LiveStream):
+        """Copies new events to Redis in batches until the stream ends."""
+        key = _stream_key(stream.stream_id)
+        while True:
+            changed = stream._changed
+            if stream._unmirrored:
+                batch, stream._unmirrored = stream._unmirrored, []
+                try:
+                    await CacheManager.stream_append(
+                        key,
+                        [(seq, {"event": event, "data": data}) for seq, event, data in batch],
+                        maxlen=self.buffer_size,
+                        expire=self.retention_seconds,
+                    )
+                except Exception as e:
+                    # Local buffer still serves same-worker resumes
+                    print(f"WARNING: stream mirror disabled ({stream.stream_id}): {e}")
+                    return
+                continue
+            if stream.finished:
+                return
+            await changed.wait()
+
+    # ------------------------------
+    # Subscriber side
+    # ------------------------------
+    def get(self, stream_id: str) -> Optional[LiveStream]:
+        return self._streams.get(stream_id)
+
+    async def subscribe(
+        self,
+        stream: LiveStream,
+        after_seq: int = 0,
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Yields SSE-ready events after `after_seq`, then follows the live
+        stream until its terminal event.
+        """
+        stream.subscribers += 1
+        if stream._cancel_handle is not None:
+            stream._cancel_handle.cancel()
+            stream._cancel_handle = None
+
+        try:
+            seq = after_seq
+            while True:
+                changed = stream._changed
+                # Seqs in the buffer are contiguous: the next event sits at
+                # an offset from the oldest one retained (no copy, no scan)
+                while seq < stream.last_seq:
+                    oldest = stream.events[0][0] if stream.events else stream.last_seq + 1
+                    if seq + 1 < oldest:
+                        # Fell more than buffer_size events behind: the ones
+                        # it missed are gone (as can_replay_from reports)
+                        yield {"event": "error", "data": json.dumps({"error": "resume_window_exceeded"})}
+                        return
+                    entry_seq, event, data = stream.events[seq + 1 - oldest]
+                    seq = entry_seq
+                    yield {
+                        "id": format_event_id(stream.stream_id, entry_seq),
+                        "event": event,
+                        "data": data,
+                    }
+                if stream.finished:
+                    return
+                await changed.wait()
+        finally:
+            stream.subscribers -= 1
+            if stream.subscribers == 0 and not stream.finished:
+                self._schedule_cancel(stream)
+
+    def _schedule_cancel(self, stream: LiveStream):
+        if self.resume_grace_seconds <= 0:
+            self._cancel_if_orphaned(stream)
+            return
+        loop = asyncio.get_running_loop()
+        stream._cancel_handle = loop.call_later(
+            self.resume_grace_seconds, self._cancel_if_orphaned, stream
+        )
+
+    @staticmethod
+    def _cancel_if_orphaned(stream: LiveStream):
+        stream._cancel_handle = None
+        if stream.subscribers == 0 and not stream.finished and stream.task:
+            stream.task.cancel()
+
+    # ------------------------------
+    # Cross-worker resume (Redis)
+    # ------------------------------
+    async def owner_of(self, stream_id: str) -> Optional[str]:
+        meta = await CacheManager.get(_meta_key(stream_id))
+        return meta.get("user_id") if meta else None
+
+    async def replay_remote(
+        self,
+        stream_id: str,
+        after_seq: int = 0,
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Replays a stream owned by another worker from Redis, polling for
+        new events until a terminal event or `remote_idle_timeout`.
+        """
+        key = _stream_key(stream_id)
+        seq = after_seq
+        idle = 0.0
+        while True:
+            entries = await CacheManager.stream_range(key, seq)
+            if entries and entries[0][0] > seq + 1:
+                yield {"event": "error", "data": json.dumps({"error": "resume_window_exceeded"})}
+                return
+
+            for entry_seq, fields in entries:
+                seq = entry_seq
+                yield {
+                    "id": format_event_id(stream_id, entry_seq),
+                    "event": fields.get("event", "message"),
+                    "data": fields.get("data", "{}"),
+                }
+                if fields.get("event") in TERMINAL_EVENTS:
+                    return
+
+            idle = 0.0 if entries else idle + self.remote_poll_seconds
+            if idle >= self.remote_idle_timeout:
+                yield {"event": "error", "data": json.dumps({"error": "stream_expired"})}
+                return
+            await asyncio.sleep(self.remote_poll_seconds)
@@ -1,22 +1,32 @@
 # app/services/history_crud.py (UPDATED with Conversation logic)
 
-from typing import List, Dict, Optional
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, delete
+from sqlalchemy import select, desc, delete, tuple_, update, case
 from app.models.chat import ChatHistory, Conversation  # <-- Import Conversation
-from uuid import UUID
+from uuid import UUID, uuid4
 
 # --- CONVERSATION CRUD ---
 
+NEW_CONVERSATION_TITLE = "New Conversation"
+
 
 async def create_new_conversation(
-    session: AsyncSession, user_id: UUID, initial_title: str = "New Conversation"
+    session: AsyncSession, user_id: UUID, initial_title: str = NEW_CONVERSATION_TITLE
 ) -> Conversation:
-    """Creates a new conversation session for the user."""
-    new_conversation = Conversation(user_id=user_id, title=initial_title)
+    """
+    Creates a new conversation session for the user.
+    Chat turns do not use this: their first turn inserts the conversation
+    (see turn_writer.py).
+    """
+    # Every column is filled in app-side: no refresh after the commit
+    new_conversation = Conversation(id=uuid4(), user_id=user_id, title=initial_title)
     session.add(new_conversation)
     await session.commit()
-    await session.refresh(new_conversation)
     return new_conversation
 
 
@@ -55,6 +65,7 @@ async def add_message_to_history(
     conversation_id: UUID,  # <-- NEW PARAMETER
     role: str,
     content: str,
+    truncated: bool = False,
 ):
     """Stores a single message tied to a specific conversation."""
     new_message = ChatHistory(
@@ -62,6 +73,7 @@ async def add_message_to_history(
         conversation_id=conversation_id,  # <-- USE NEW PARAMETER
         role=role,
         content=content,
+        truncated=truncated,
     )
     session.add(new_message)
     # NOTE: We COMMIT in the background task now, so we remove the commit here.
@@ -69,6 +81,30 @@ async def add_message_to_history(
     return new_message
 
 
+async def record_conversation_activity(
+    session: AsyncSession,
+    conversation_id: UUID,
+    added_messages: int,
+    at: datetime,
+):
+    """
+    Keeps the denormalised sidebar columns in step with chat_history.
+    Call in the same transaction as the inserts. last_message_at never
+    moves backwards, whatever order concurrent turns commit in.
+    """
+    await session.execute(
+        update(Conversation)
+        .where(Conversation.id == conversation_id)
+        .values(
+            message_count=Conversation.message_count + added_messages,
+            last_message_at=case(
+                (Conversation.last_message_at > at, Conversation.last_message_at),
+                else_=at,
+            ),
+        )
+    )
+
+
 # --- GET HISTORY (MODIFIED) ---
 
 
@@ -76,16 +112,18 @@ async def get_last_n_messages(
     session: AsyncSession,
     conversation_id: UUID,  # <-- CHANGED PARAMETER to focus on Conversation ID
     n: int = 10,
+    include_ids: bool = False,
 ) -> List[Dict]:
     """
     Retrieves the last N messages for a CONVERSATION.
+    `include_ids` adds each message's "id" (history cache bookkeeping).
     """
     stmt = (
         select(ChatHistory)
         .where(
             ChatHistory.conversation_id == conversation_id
         )  # <-- FILTER BY CONVERSATION
-        .order_by(desc(ChatHistory.timestamp))
+        .order_by(desc(ChatHistory.timestamp), desc(ChatHistory.id))
         .limit(n)
     )
 
@@ -94,7 +132,10 @@ async def get_last_n_messages(
 
     formatted_history = []
     for msg in reversed(messages):
-        formatted_history.append({"role": msg.role, "content": msg.content})
+        item = {"role": msg.role, "content": msg.content}
+        if include_ids:
+            item["id"] = msg.id
+        formatted_history.append(item)
 
     return formatted_history
 
@@ -119,45 +160,199 @@ async def delete_conversation_by_id(
     return result.scalar_one_or_none()
 
 
-async def update_conversation_title(session: AsyncSession, conversation_id: UUID, user_id: UUID, new_title: str):
+async def update_conversation_title(
+    session: AsyncSession, conversation_id: UUID, user_id: UUID, new_title: str
+) -> bool:
     """
-    Updates the title of a specific conversation in the database.
+    Updates the title of a specific conversation in the database: one
+    keyed UPDATE, no read first. False if it is not the user's conversation.
     """
     result = await session.execute(
-        select(Conversation).where(
+        update(Conversation)
+        .where(
             Conversation.id == conversation_id,
             Conversation.user_id == user_id
         )
+        .values(title=new_title)
     )
-    conversation = result.scalar_one_or_none()
-    
-    if conversation:
-        conversation.title = new_title
-        await session.commit()
-        await session.refresh(conversation)
-        return conversation
-    return None
+    await session.commit()
+    return result.rowcount > 0
 
 async def get_full_conversation_messages(
     session: AsyncSession, 
     conversation_id: UUID, 
 ) -> List[Dict]:
-    """Retrieves ALL messages for a conversation."""
+    """Retrieves ALL messages for a conversation (use stream_conversation_messages for exports)."""
+    return [
+        {"role": m["role"], "content": m["content"]}
+        async for m in stream_conversation_messages(session, conversation_id)
+    ]
+
+
+async def stream_conversation_messages(
+    session: AsyncSession,
+    conversation_id: UUID,
+    batch_size: int = 500,
+) -> AsyncIterator[Dict]:
+    """
+    Every message of a conversation, oldest first, from a server-side
+    cursor: at most `batch_size` rows are held in memory at a time.
+    """
     stmt = (
-        select(ChatHistory)
+        select(
+            ChatHistory.id,
+            ChatHistory.role,
+            ChatHistory.content,
+            ChatHistory.timestamp,
+            ChatHistory.truncated,
+        )
         .where(ChatHistory.conversation_id == conversation_id)
-        .order_by(ChatHistory.timestamp) # Order by ascending time
+        .order_by(ChatHistory.timestamp, ChatHistory.id)
+        .execution_options(yield_per=batch_size)
     )
-    
-    result = await session.execute(stmt)
-    messages = result.scalars().all()
-    
-    # Format the messages (we don't need to reverse since we ordered by timestamp ascending)
-    formatted_history = []
-    for msg in messages:
-        formatted_history.append({
-            "role": msg.role,
-            "content": msg.content
-        })
-        
-    return formatted_history
\ No newline at end of file
+    result = await session.stream(stmt)
+    try:
+        async for row in result:
+            yield {
+                "id": row.id,
+                "role": row.role,
+                "content": row.content,
+                "timestamp": row.timestamp.isoformat(),
+                "truncated": row.truncated,
+            }
+    finally:
+        await result.close()
+
+
+# --- KEYSET PAGINATION ---
+# A cursor is the (timestamp, id) of the last row seen, opaque to clients.
+# Pages are index range scans: the cost does not grow with how far back the
+# page is, unlike OFFSET.
+
+MessageKey = Tuple[datetime, int]
+ConversationKey = Tuple[datetime, UUID]
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_key(timestamp: datetime, row_id) -> str:
+    raw = json.dumps([timestamp.isoformat(), row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_key(cursor: str, parse_id) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(timestamp), parse_id(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor.")
+
+
+def encode_message_cursor(key: MessageKey) -> str:
+    return _encode_key(key[0], key[1])
+
+
+def decode_message_cursor(cursor: str) -> MessageKey:
+    return _decode_key(cursor, int)
+
+
+def encode_conversation_cursor(key: ConversationKey) -> str:
+    return _encode_key(key[0], str(key[1]))
+
+
+def decode_conversation_cursor(cursor: str) -> ConversationKey:
+    return _decode_key(cursor, UUID)
+
+
+async def get_conversations_page(
+    session: AsyncSession,
+    user_id: UUID,
+    limit: int = 30,
+    before: Optional[ConversationKey] = None,
+) -> Tuple[List[Dict], Optional[ConversationKey]]:
+    """
+    Sidebar page: most recent activity first. Returns the rows and the key
+    to pass as `before` for the next page (None on the last page).
+    Selects only the columns in ix_conversations_user_last_message_at.
+    """
+    stmt = (
+        select(
+            Conversation.id,
+            Conversation.title,
+            Conversation.created_at,
+            Conversation.last_message_at,
+            Conversation.message_count,
+        )
+        .where(Conversation.user_id == user_id)
+        .order_by(desc(Conversation.last_message_at), desc(Conversation.id))
+        .limit(limit + 1)
+    )
+    if before is not None:
+        stmt = stmt.where(
+            tuple_(Conversation.last_message_at, Conversation.id) < tuple_(*before)
+        )
+
+    rows = (await session.execute(stmt)).all()
+    next_key = (rows[limit - 1].last_message_at, rows[limit - 1].id) if len(rows) > limit else None
+    return [
+        {
+            "id": str(row.id),
+            "title": row.title,
+            "created_at": row.created_at.isoformat(),
+            "last_message_at": row.last_message_at.isoformat(),
+            "message_count": row.message_count,
+        }
+        for row in rows[:limit]
+    ], next_key
+
+
+async def get_messages_page(
+    session: AsyncSession,
+    conversation_id: UUID,
+    limit: int = 50,
+    before: Optional[MessageKey] = None,
+    after: Optional[MessageKey] = None,
+) -> Tuple[List[Dict], bool]:
+    """
+    Up to `limit` messages, oldest first, and whether more exist in the
+    paging direction:
+    - neither cursor: the latest messages (more = older ones exist)
+    - before: the messages just older than that key
+    - after: the messages just newer than that key
+    Only the needed columns are selected (no ORM objects).
+    """
+    key = tuple_(ChatHistory.timestamp, ChatHistory.id)
+    stmt = select(
+        ChatHistory.id,
+        ChatHistory.role,
+        ChatHistory.content,
+        ChatHistory.timestamp,
+        ChatHistory.truncated,
+    ).where(ChatHistory.conversation_id == conversation_id)
+
+    if after is not None:
+        stmt = stmt.where(key > tuple_(*after)).order_by(ChatHistory.timestamp, ChatHistory.id)
+    else:
+        if before is not None:
+            stmt = stmt.where(key < tuple_(*before))
+        stmt = stmt.order_by(desc(ChatHistory.timestamp), desc(ChatHistory.id))
+
+    rows = (await session.execute(stmt.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if after is None:
+        rows.reverse()
+
+    return [
+        {
+            "id": row.id,
+            "role": row.role,
+            "content": row.content,
+            "timestamp": row.timestamp.isoformat(),
+            "truncated": row.truncated,
+        }
+        for row in rows
+    ], has_more
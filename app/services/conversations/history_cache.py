@@ -0,0 +1,153 @@
+"""
+Recent chat history per conversation, kept in Redis.
+
+Each conversation has a list of its last `max_messages` messages
+("history:<conversation_id>"), so a chat turn reads its prompt history
+without touching Postgres:
+
+- write-through: persist_after_commit appends each committed turn (RPUSHX,
+  LTRIM to the cap). RPUSHX never creates the list, so a partial list
+  cannot appear.
+- read: the tail of the list. On a miss the history comes from the DB,
+  and the list is created from it unless a turn was appended meanwhile
+  (version counter, see CacheManager.list_create).
+
+Elements are JSON {"id", "role", "content"}. The ids let readers drop the
+duplicate a rebuild racing an append can leave behind.
+
+Consistency check: python -m app.services.conversations.history_check
+"""
+import json
+from typing import Dict, List
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import settings
+from app.services.cache.redis_manager import CacheManager
+from app.services.conversations.conversations_service import get_last_n_messages
+
+
+def history_key(conversation_id) -> str:
+    return f"history:{conversation_id}"
+
+
+def _version_key(conversation_id) -> str:
+    return f"history:{conversation_id}:version"
+
+
+def _unique(items: List[Dict]) -> List[Dict]:
+    seen = set()
+    out = []
+    for item in items:
+        if item.get("id") not in seen:
+            seen.add(item.get("id"))
+            out.append(item)
+    return out
+
+
+def _public(items: List[Dict]) -> List[Dict]:
+    return [{"role": m["role"], "content": m["content"]} for m in items]
+
+
+class HistoryCache:
+    def __init__(self, max_messages: int = 50, ttl_seconds: int = 86400):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.warms = 0
+        self.warms_skipped = 0  # a turn landed while the DB was read
+        self.bypassed = 0       # more messages asked for than are cached
+        self.errors = 0
+
+    async def get_recent(self, session: AsyncSession, conversation_id: UUID, n: int = 10) -> List[Dict]:
+        """Last `n` messages, oldest first, as [{"role", "content"}]."""
+        if n > self.max_messages:
+            self.bypassed += 1
+            return await get_last_n_messages(session, conversation_id, n=n)
+
+        try:
+            # Twice the tail: room for a duplicated turn
+            raw, version = await CacheManager.list_tail(
+                history_key(conversation_id), 2 * n, _version_key(conversation_id)
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"WARNING: history cache read failed for {conversation_id}: {e}")
+            return await get_last_n_messages(session, conversation_id, n=n)
+
+        if raw:
+            self.hits += 1
+            return _public(_unique([json.loads(item) for item in raw])[-n:])
+
+        self.misses += 1
+        messages = await get_last_n_messages(
+            session, conversation_id, n=self.max_messages, include_ids=True
+        )
+        await self._warm(conversation_id, messages, version)
+        return _public(messages[-n:])
+
+    async def _warm(self, conversation_id: UUID, messages: List[Dict], version: int):
+        try:
+            created = await CacheManager.list_create(
+                history_key(conversation_id),
+                [json.dumps(m) for m in messages],
+                expire=self.ttl_seconds,
+                version_key=_version_key(conversation_id),
+                version=version,
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"WARNING: history cache warm failed for {conversation_id}: {e}")
+            return
+        if created:
+            self.warms += 1
+        elif messages:
+            self.warms_skipped += 1
+
+    async def append(self, conversation_id: UUID, messages: List[Dict]):
+        """
+        Write-through for committed messages ({"id", "role", "content"}).
+        If the append fails the list is dropped, so it cannot miss a turn.
+        """
+        key = history_key(conversation_id)
+        try:
+            await CacheManager.list_append(
+                key,
+                [json.dumps(m) for m in messages],
+                maxlen=self.max_messages,
+                expire=self.ttl_seconds,
+                version_key=_version_key(conversation_id),
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"WARNING: history cache append failed for {conversation_id}: {e}")
+            await self.drop(conversation_id)
+
+    async def drop(self, conversation_id: UUID):
+        try:
+            await CacheManager.list_drop(history_key(conversation_id), _version_key(conversation_id))
+        except Exception as e:
+            self.errors += 1
+            print(f"ERROR: history cache for {conversation_id} could not be dropped: {e}")
+
+    def stats(self) -> Dict:
+        reads = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / reads, 4) if reads else None,
+            "warms": self.warms,
+            "warms_skipped": self.warms_skipped,
+            "bypassed": self.bypassed,
+            "errors": self.errors,
+        }
+
+
+history_cache = HistoryCache(
+    max_messages=settings.chat_history_cache_messages,
+    ttl_seconds=settings.chat_history_cache_ttl_seconds,
+)
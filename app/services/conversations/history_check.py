@@ -0,0 +1,87 @@
+"""
+Consistency check: Redis history lists against Postgres.
+
+For each conversation, the cached list (deduplicated, as readers see it)
+must equal the conversation's last messages in the DB, same ids, roles and
+content in the same order. Conversations without a cached list are skipped.
+
+    python -m app.services.conversations.history_check [--recent 200] [--conversation ID ...] [--repair]
+
+--repair drops every inconsistent list; the next turn rebuilds it from the
+DB. Exits with status 1 when inconsistencies were found.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import desc, select
+
+from app.db.db import AsyncSessionLocal
+from app.models.chat import Conversation
+from app.services.cache.redis_manager import close_redis, r
+from app.services.conversations.conversations_service import get_last_n_messages
+from app.services.conversations.history_cache import _unique, history_cache, history_key
+
+
+def _diff(cached: List[Dict], expected: List[Dict]) -> Optional[str]:
+    """First difference between two message lists, or None."""
+    if len(cached) != len(expected):
+        return f"{len(cached)} cached vs {len(expected)} in DB"
+    for i, (a, b) in enumerate(zip(cached, expected)):
+        for field in ("id", "role", "content"):
+            if a.get(field) != b.get(field):
+                return f"message {i}: {field} differs (cached id {a.get('id')}, DB id {b.get('id')})"
+    return None
+
+
+async def check_conversation(session, conversation_id: UUID) -> Optional[str]:
+    """None when consistent (or not cached), else a description."""
+    raw = await r.lrange(history_key(conversation_id), 0, -1)
+    if not raw:
+        return None
+    cached = _unique([json.loads(item) for item in raw])
+    expected = await get_last_n_messages(
+        session, conversation_id, n=len(cached), include_ids=True
+    )
+    return _diff(cached, expected)
+
+
+async def main(args) -> int:
+    bad = 0
+    checked = 0
+    try:
+        async with AsyncSessionLocal() as session:
+            if args.conversation:
+                ids = [UUID(c) for c in args.conversation]
+            else:
+                result = await session.execute(
+                    select(Conversation.id).order_by(desc(Conversation.created_at)).limit(args.recent)
+                )
+                ids = list(result.scalars().all())
+
+            for conversation_id in ids:
+                problem = await check_conversation(session, conversation_id)
+                checked += 1
+                if problem is None:
+                    continue
+                bad += 1
+                print(f"INCONSISTENT {conversation_id}: {problem}")
+                if args.repair:
+                    await history_cache.drop(conversation_id)
+                    print(f"  dropped {history_key(conversation_id)}")
+    finally:
+        await close_redis()
+
+    print(f"Checked {checked} conversations: {bad} inconsistent")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recent", type=int, default=200, help="newest N conversations")
+    parser.add_argument("--conversation", nargs="*", help="specific conversation ids")
+    parser.add_argument("--repair", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,327 @@
+"""
+Group commit for chat turn persistence.
+
+Chat requests submit their (user message, assistant reply) pair and await a
+future. One flusher task collects the turns submitted by all requests and
+writes them in a single transaction: the rows go in as multi-row
+INSERT ... RETURNING statements, followed by one activity update per
+conversation. A batch is flushed `flush_interval_ms` after its first turn
+arrived, or as soon as it holds `max_batch_turns` turns. While a batch is
+being written, the next one accumulates.
+
+The first turn of a new conversation also creates it: the conversation id
+is generated by the app, and its row goes into the same transaction
+(INSERT ... ON CONFLICT DO NOTHING) ahead of the messages.
+
+A failed batch is retried with backoff. If it still fails it is split in
+halves and each half retried, so one bad turn (e.g. its conversation was
+deleted meanwhile) fails only its own future. A batch whose COMMIT itself
+failed is not retried: it may have been committed with the acknowledgement
+lost, and chat_history rows have no conflict key, so a retry could store
+the messages (and count them) twice.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.config.settings import settings
+from app.db.db import AsyncSessionLocal
+from app.models.chat import ChatHistory, Conversation
+from app.services.conversations.conversations_service import (
+    NEW_CONVERSATION_TITLE,
+    record_conversation_activity,
+)
+
+logger = logging.getLogger(__name__)
+
+# Dialects with INSERT ... ON CONFLICT
+_CONFLICT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+class CommitOutcomeUnknown(Exception):
+    """The COMMIT failed: the batch may or may not be in the DB."""
+
+
+@dataclass
+class _Turn:
+    user_id: UUID
+    conversation_id: UUID
+    user_input: str
+    reply: str
+    truncated: bool
+    at: datetime
+    new_conversation: bool
+    future: asyncio.Future = field(repr=False)
+
+
+class TurnWriter:
+    """
+    Process-wide group-commit writer (module singleton below).
+    """
+
+    def __init__(
+        self,
+        max_batch_turns: int = 100,
+        flush_interval_ms: float = 5.0,
+        max_attempts: int = 3,
+        retry_delay_seconds: float = 0.05,
+        session_factory=AsyncSessionLocal,
+    ):
+        self.max_batch_turns = max_batch_turns
+        self.flush_interval_ms = flush_interval_ms
+        self.max_attempts = max_attempts
+        self.retry_delay_seconds = retry_delay_seconds
+        self.session_factory = session_factory
+
+        self._pending: List[_Turn] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrics
+        self._flushes = 0
+        self._flush_errors = 0
+        self._retries = 0
+        self._turns_flushed = 0
+        self._turns_failed = 0
+        self._max_batch = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ------------------------------
+    # Lifecycle
+    # ------------------------------
+    def start(self):
+        if self._flusher is not None and not self._flusher.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self, timeout: float = 10.0):
+        """Writes whatever is still pending, then stops the flusher."""
+        if self._flusher is None:
+            return
+        flusher, self._flusher = self._flusher, None
+        # Not cancelled: a batch cut off mid-commit could be written twice
+        self._stopping = True
+        self._wakeup.set()
+        self._full.set()
+        try:
+            await asyncio.wait_for(asyncio.shield(flusher), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Turn writer stop timed out; %d turns not persisted", len(self._pending))
+            self._fail(self._pending, RuntimeError("turn writer stopped"))
+            self._pending = []
+        finally:
+            self._stopping = False
+
+    # ------------------------------
+    # Producer side
+    # ------------------------------
+    async def submit(
+        self,
+        user_id: UUID,
+        conversation_id: UUID,
+        user_input: str,
+        reply: str,
+        truncated: bool = False,
+        new_conversation: bool = False,
+    ) -> List[Dict]:
+        """
+        Queues one turn and waits until it is committed. Returns both
+        messages as {"id", "role", "content"}, user message first.
+        `new_conversation`: insert the conversation row with this turn.
+        Raises the batch's error if the turn could not be written.
+        """
+        if self._flusher is None or self._flusher.done():
+            self.start()
+
+        turn = _Turn(
+            user_id=user_id,
+            conversation_id=conversation_id,
+            user_input=user_input,
+            reply=reply,
+            truncated=truncated,
+            at=datetime.utcnow(),
+            new_conversation=new_conversation,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._pending.append(turn)
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch_turns:
+            self._full.set()
+
+        # The flusher owns the future; a cancelled request must not cancel it
+        return await asyncio.shield(turn.future)
+
+    # ------------------------------
+    # Flushing
+    # ------------------------------
+    async def _flush_loop(self):
+        while True:
+            await self._wakeup.wait()
+            # Give concurrent requests a moment to join this batch
+            if len(self._pending) < self.max_batch_turns:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval_ms / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush_next()
+            if self._stopping and not self._pending:
+                return
+
+    async def _flush_next(self):
+        batch = self._pending[:self.max_batch_turns]
+        self._pending = self._pending[self.max_batch_turns:]
+        if len(self._pending) < self.max_batch_turns and not self._stopping:
+            self._full.clear()
+        if not self._pending and not self._stopping:
+            self._wakeup.clear()
+        if batch:
+            await self._write_with_retry(batch)
+
+    async def _write_with_retry(self, batch: List[_Turn], attempts: Optional[int] = None):
+        attempts = attempts or self.max_attempts
+        for attempt in range(1, attempts + 1):
+            started = time.perf_counter()
+            try:
+                ids = await self._write(batch)
+            except CommitOutcomeUnknown as e:
+                # Not retried, see the module docstring
+                self._flush_errors += 1
+                self._turns_failed += len(batch)
+                logger.exception("Turn batch commit failed (%d turns), not retried", len(batch))
+                self._fail(batch, e)
+                return
+            except Exception as e:
+                self._flush_errors += 1
+                logger.exception("Turn batch write failed (%d turns, attempt %d)", len(batch), attempt)
+                if attempt < attempts:
+                    self._retries += 1
+                    await asyncio.sleep(self.retry_delay_seconds * 2 ** (attempt - 1))
+                    continue
+                if len(batch) > 1:
+                    # Isolate the turn(s) that keep failing; transient
+                    # errors have had their retries by now
+                    middle = len(batch) // 2
+                    await self._write_with_retry(batch[:middle], attempts=1)
+                    await self._write_with_retry(batch[middle:], attempts=1)
+                else:
+                    self._turns_failed += 1
+                    self._fail(batch, e)
+                return
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self._flushes += 1
+            self._turns_flushed += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            self._last_flush_ms = elapsed_ms
+            self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+            for turn, (user_message_id, assistant_message_id) in zip(batch, ids):
+                if not turn.future.done():
+                    turn.future.set_result([
+                        {"id": user_message_id, "role": "user", "content": turn.user_input},
+                        {"id": assistant_message_id, "role": "assistant", "content": turn.reply},
+                    ])
+            return
+
+    async def _write(self, batch: List[_Turn]) -> List[tuple]:
+        """One transaction. Returns (user message id, assistant message id) per turn."""
+        rows = []
+        for turn in batch:
+            common = {"user_id": turn.user_id, "conversation_id": turn.conversation_id, "timestamp": turn.at}
+            rows.append({**common, "role": "user", "content": turn.user_input, "truncated": False})
+            rows.append({**common, "role": "assistant", "content": turn.reply, "truncated": turn.truncated})
+
+        activity: Dict[UUID, List] = {}
+        for turn in batch:
+            entry = activity.setdefault(turn.conversation_id, [0, turn.at])
+            entry[0] += 2
+            entry[1] = max(entry[1], turn.at)
+
+        conversations = [
+            {
+                "id": turn.conversation_id,
+                "user_id": turn.user_id,
+                "title": NEW_CONVERSATION_TITLE,
+                "created_at": turn.at,
+                "last_message_at": turn.at,
+                "message_count": 0,
+            }
+            for turn in batch
+            if turn.new_conversation
+        ]
+
+        async with self.session_factory() as session:
+            if conversations:
+                # Only this insert is idempotent; the message inserts are
+                # not, which is why a failed COMMIT is never retried
+                dialect_insert = _CONFLICT_INSERTS[session.get_bind().dialect.name]
+                await session.execute(
+                    dialect_insert(Conversation).on_conflict_do_nothing(index_elements=["id"]),
+                    conversations,
+                )
+
+            # executemany with RETURNING: rendered as batched multi-row
+            # INSERT ... VALUES ... RETURNING, ids in parameter order (SQLite
+            # cannot guarantee that order and falls back to a row per statement)
+            result = await session.execute(
+                insert(ChatHistory).returning(ChatHistory.id, sort_by_parameter_order=True),
+                rows,
+            )
+            ids = result.scalars().all()
+
+            # Fixed lock order, so concurrent workers cannot deadlock
+            for conversation_id in sorted(activity, key=str):
+                added, at = activity[conversation_id]
+                await record_conversation_activity(session, conversation_id, added, at)
+            try:
+                await session.commit()
+            except Exception as e:
+                raise CommitOutcomeUnknown(str(e)) from e
+
+        return list(zip(ids[0::2], ids[1::2]))
+
+    @staticmethod
+    def _fail(batch: List[_Turn], error: Exception):
+        for turn in batch:
+            if not turn.future.done():
+                turn.future.set_exception(error)
+
+    # ------------------------------
+    # Metrics
+    # ------------------------------
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": len(self._pending),
+            "flushes": self._flushes,
+            "flush_errors": self._flush_errors,
+            "retries": self._retries,
+            "turns_flushed": self._turns_flushed,
+            "turns_failed": self._turns_failed,
+            "avg_batch_turns": round(self._turns_flushed / self._flushes, 1) if self._flushes else 0.0,
+            "max_batch_turns": self._max_batch,
+            "last_flush_ms": round(self._last_flush_ms, 1),
+            "max_flush_ms": round(self._max_flush_ms, 1),
+            "avg_flush_ms": round(self._total_flush_ms / self._flushes, 1) if self._flushes else 0.0,
+        }
+
+
+turn_writer = TurnWriter(
+    max_batch_turns=settings.chat_persist_batch_turns,
+    flush_interval_ms=settings.chat_persist_flush_ms,
+    max_attempts=settings.chat_persist_max_attempts,
+)
@@ -0,0 +1,70 @@
+"""
+NDJSON exports, streamed with bounded memory.
+
+Messages come from server-side cursors (stream_conversation_messages),
+memories one mem0 page at a time. Nothing is materialised beyond one batch,
+so memory use does not grow with the size of the account.
+
+Each generator opens its own DB session: a StreamingResponse body runs
+after the request's dependencies (and their session) have been closed.
+
+Account export lines, in order:
+    {"type": "account", ...}
+    {"type": "conversation", ...} followed by its {"type": "message", ...}
+    ... (newest conversation first)
+    {"type": "memory", ...}
+"""
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict
+from uuid import UUID
+
+from sqlalchemy import desc, select
+
+from app.db.db import AsyncSessionLocal
+from app.models.chat import Conversation
+from app.services.conversations.conversations_service import stream_conversation_messages
+from app.services.memory.mem0_service import mem0
+
+MEMORY_FIELDS = ("id", "memory", "categories", "metadata", "created_at", "updated_at")
+
+
+def _line(record: Dict) -> str:
+    return json.dumps(record, default=str) + "\n"
+
+
+async def iter_conversation_ndjson(conversation_id: UUID) -> AsyncIterator[str]:
+    """One conversation's messages, one JSON object per line."""
+    async with AsyncSessionLocal() as session:
+        async for message in stream_conversation_messages(session, conversation_id):
+            yield _line(message)
+
+
+async def iter_account_ndjson(user_id: UUID) -> AsyncIterator[str]:
+    yield _line({
+        "type": "account",
+        "user_id": str(user_id),
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+    async with AsyncSessionLocal() as session:
+        # Conversation rows are small; messages are what can be huge
+        result = await session.execute(
+            select(Conversation.id, Conversation.title, Conversation.created_at)
+            .where(Conversation.user_id == user_id)
+            .order_by(desc(Conversation.created_at))
+        )
+        conversations = result.all()
+
+        for conversation in conversations:
+            yield _line({
+                "type": "conversation",
+                "id": str(conversation.id),
+                "title": conversation.title,
+                "created_at": conversation.created_at.isoformat(),
+            })
+            async for message in stream_conversation_messages(session, conversation.id):
+                yield _line({"type": "message", "conversation_id": str(conversation.id), **message})
+
+    async for memory in mem0.aiter_all(str(user_id)):
+        yield _line({"type": "memory", **{field: memory.get(field) for field in MEMORY_FIELDS}})
@@ -0,0 +1,190 @@
+"""
+Change-driven freshness for cached insights.
+
+Each user has one "memories changed at" marker. Every memory write bumps it;
+a cached insight computed before the marker is stale and gets revalidated.
+Revalidation is cheap when nothing relevant changed: InsightService compares
+the memory fingerprint and skips the LLM (see memory_fingerprint).
+
+Recomputation itself is queued for the precompute worker (precompute.py):
+a Redis sorted set of user ids scored by due time, minus a priority boost.
+ZADD LT keeps a user's earliest slot, so repeated triggers never delay it.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Dict, List, Optional
+
+from app.config.settings import settings
+from app.services.cache.redis_manager import (
+    CacheManager,
+    envelope_is_current,
+    envelope_is_fresh,
+    make_envelope,
+    tag_versions,
+)
+from app.services.cache.tags import user_tag
+
+INSIGHT_KINDS = ("hero", "data", "deep")
+
+QUEUE_KEY = "insights:queue"
+ACTIVE_KEY = "insights:active"  # user_id -> last memory write
+WORKER_HEARTBEAT_KEY = "insights:worker:heartbeat"
+
+# Seconds subtracted from the due time: "interactive" (a user is looking at
+# a stale insight) jumps ahead of anything due within the next hour
+PRIORITY_BOOST = {"interactive": 3600, "activity": 0, "scheduled": 0}
+
+
+def insight_key(kind: str, user_id: str) -> str:
+    return f"insights:{kind}:{user_id}"
+
+
+def insight_tags(user_id: str) -> List[str]:
+    return [user_tag(user_id)]
+
+
+def _changed_key(user_id: str) -> str:
+    return f"insights:changed:{user_id}"
+
+
+def memory_fingerprint(*memory_sets: List[Dict]) -> str:
+    """Stable hash of memory ids + update times (order-insensitive)."""
+    parts = sorted(
+        f"{m.get('id')}@{m.get('updated_at') or m.get('created_at')}"
+        for memories in memory_sets
+        for m in memories or []
+    )
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+async def mark_insights_dirty(user_id: str):
+    """Called on every memory write for the user."""
+    now = time.time()
+    await CacheManager.set(
+        _changed_key(user_id),
+        {"at": now},
+        expire=settings.insight_max_age_seconds + settings.cache_stale_seconds,
+    )
+    # The first write queues a recompute `debounce` seconds out; later
+    # writes in that window join it (LT), so a burst of turns costs one run
+    await CacheManager.zadd_many([
+        (ACTIVE_KEY, user_id, now, False),
+        (QUEUE_KEY, user_id, now + settings.insight_precompute_debounce_seconds, True),
+    ])
+
+
+async def request_precompute(user_id: str, priority: str = "interactive", delay: float = 0.0):
+    score = time.time() + delay - PRIORITY_BOOST[priority]
+    await CacheManager.zadd_many([(QUEUE_KEY, user_id, score, True)])
+
+
+async def precompute_worker_alive() -> bool:
+    """Routes leave stale refreshes to the worker only while it is running."""
+    return bool(await CacheManager.get(WORKER_HEARTBEAT_KEY))
+
+
+async def memories_changed_at(user_id: str) -> Optional[float]:
+    marker = await CacheManager.get(_changed_key(user_id))
+    return marker.get("at") if marker else None
+
+
+# -----------------------------
+# ALL SECTIONS (/insights/all)
+# -----------------------------
+# One combined computation per user in this worker at a time
+_all_inflight: Dict[str, asyncio.Task] = {}
+_background: set = set()
+
+
+async def _compute_sections(
+    service,
+    user_id: str,
+    kinds: List[str],
+    previous: Dict[str, Dict],
+    tags: Dict[str, int],
+) -> Dict[str, Dict]:
+    """Computes `kinds` together and caches each section under its own key."""
+    computed_at = time.time()
+    records = await service.get_all_insights(user_id, kinds=kinds, previous=previous)
+    expire = settings.insight_max_age_seconds
+    await CacheManager.set_many(
+        {
+            insight_key(kind, user_id): make_envelope(record, computed_at, expire, tags)
+            for kind, record in records.items()
+        },
+        expire=expire + settings.cache_stale_seconds,
+    )
+    return records
+
+
+def _compute_once(
+    service,
+    user_id: str,
+    kinds: List[str],
+    previous: Dict[str, Dict],
+    tags: Dict[str, int],
+) -> asyncio.Task:
+    task = _all_inflight.get(user_id)
+    if task is None:
+        task = asyncio.create_task(_compute_sections(service, user_id, kinds, previous, tags))
+        _all_inflight[user_id] = task
+        task.add_done_callback(
+            lambda t: _all_inflight.pop(user_id, None) if _all_inflight.get(user_id) is t else None
+        )
+    return task
+
+
+async def _refresh_in_background(task: asyncio.Task, user_id: str):
+    try:
+        await task
+    except Exception as e:
+        print(f"WARNING: background insight refresh failed for {user_id}, still serving stale: {e!r}")
+
+
+async def load_all_insights(service, user_id: str, refresh: bool = False) -> Dict[str, Dict]:
+    """
+    Every insight section in one call. Sections are cached separately (the
+    same keys the per-section routes use): fresh ones come from one MGET,
+    missing ones are computed together with deduplicated, concurrent memory
+    searches, and stale ones are served while they are refreshed (by the
+    precompute worker if it is running).
+    """
+    keys = {kind: insight_key(kind, user_id) for kind in INSIGHT_KINDS}
+    valid_after = await memories_changed_at(user_id)
+    tags = await tag_versions(insight_tags(user_id))
+    entries = {} if refresh else await CacheManager.get_many(list(keys.values()))
+
+    records: Dict[str, Dict] = {}
+    stale: Dict[str, Dict] = {}
+    missing: List[str] = []
+    for kind, key in keys.items():
+        entry = entries.get(key)
+        if not envelope_is_current(entry, tags):
+            missing.append(kind)
+            continue
+        records[kind] = entry["value"]
+        if not envelope_is_fresh(entry, valid_after):
+            stale[kind] = entry["value"]
+
+    if missing:
+        # Someone has to wait anyway: bring the stale sections along
+        kinds = missing + list(stale)
+        task = _compute_once(service, user_id, kinds, stale, tags)
+        computed = await asyncio.shield(task)
+        records.update(computed)
+        # A combined run already in flight may have covered other sections
+        still_missing = [kind for kind in missing if kind not in records]
+        if still_missing:
+            records.update(await _compute_sections(service, user_id, still_missing, {}, tags))
+    elif stale:
+        if await precompute_worker_alive():
+            await request_precompute(user_id, "interactive")
+        else:
+            task = asyncio.create_task(
+                _refresh_in_background(_compute_once(service, user_id, list(stale), stale, tags), user_id)
+            )
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+
+    return {kind: records[kind]["result"] for kind in INSIGHT_KINDS}
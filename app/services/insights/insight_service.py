@@ -1,15 +1,87 @@
+import asyncio
 import json
-from typing import Dict, List
+from typing import AsyncGenerator, Dict, Iterable, List, Optional
 
 from app.services.memory.mem0_service import mem0
 from app.services.llm.bed_rock import BedrockLLM
+from app.services.llm.json_stream import JSONObjectStreamParser
+from app.services.insights.insight_cache import INSIGHT_KINDS, memory_fingerprint
 from app.repo.prompt_repo import PromptRepo
 
 
+# -----------------------------
+# MEMORY QUERY PLAN
+# -----------------------------
+# Every mem0 search an insight section needs, declared up front so a
+# combined request (get_all_insights) can deduplicate and run them at once.
+SECTION_QUERIES = {
+    "hero": ("hero",),
+    "data": ("preferences", "rhythm"),
+    "deep": ("deep",),
+}
+
+
+def _memory_queries(user_id: str) -> Dict[str, Dict]:
+    queries = PromptRepo.insight_memory_queries()
+    return {
+        "hero": {
+            "query": "What are my primary mindset shifts and goal progress?",
+            "rerank": True,
+            "limit": 10,
+        },
+        "preferences": {
+            "query": queries["preferences"],
+            "filters": {"categories": {"contains": "preferences"}},
+            "limit": 5,
+        },
+        "rhythm": {
+            "query": queries["hero"],
+            "filters": {"categories": {"contains": "behaviour"}},
+            "rerank": True,
+            "limit": 4,
+        },
+        "deep": {
+            "query": "Analyze the transition from my old habits to my new intentional lifestyle",
+            "filters": {"AND": [{"user_id": user_id}, {"categories": {"contains": "behaviour"}}]},
+            "rerank": True,
+            "limit": 15,  # Higher limit for deeper LLM context
+        },
+    }
+
+
+DEEP_FALLBACK = {
+    "modal_title": "Evolution Sync",
+    "evolution_summary": "Your neural patterns are currently realigning.",
+    "pattern_recognition": "AWAREN is waiting for more consistent data points to finalize this recognition.",
+    "reflection_question": "What does clarity feel like to you right now?"
+}
+
+
+def _normalize_filters(filters: Optional[Dict]) -> Optional[Dict]:
+    """Searches are user-scoped already: drop user_id clauses, unwrap single ANDs."""
+    if not filters or "AND" not in filters:
+        return filters
+    clauses = [c for c in filters["AND"] if set(c) != {"user_id"}]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"AND": clauses}
+
+
+def _search_signature(spec: Dict) -> str:
+    return json.dumps(
+        [spec["query"], _normalize_filters(spec.get("filters")), bool(spec.get("rerank"))],
+        sort_keys=True,
+    )
+
+
 class InsightService:
     """
     Owns all Insight-related use cases.
     No FastAPI, no routing, no auth.
+
+    Each use case returns {"result": ..., "fingerprint": ...}. Given the
+    previously cached record, the LLM is skipped when the fingerprint of the
+    memories it would read is unchanged.
     """
 
     def __init__(self):
@@ -18,68 +90,120 @@ class InsightService:
             temperature=0.4
         )
 
+    # -----------------------------
+    # RETRIEVAL
+    # -----------------------------
+    async def fetch_memories(self, user_id: str, names: Iterable[str]) -> Dict[str, List[Dict]]:
+        """
+        Runs the named plan queries concurrently. Queries that differ only in
+        limit (or in redundant user_id filters) are sent once, with the
+        largest limit, and sliced per caller.
+        """
+        plan = _memory_queries(user_id)
+        wanted = {name: plan[name] for name in names}
+
+        groups: Dict[str, List[str]] = {}
+        for name, spec in wanted.items():
+            groups.setdefault(_search_signature(spec), []).append(name)
+
+        async def _search(members: List[str]) -> List[Dict]:
+            spec = wanted[members[0]]
+            options = {"rerank": True} if spec.get("rerank") else {}
+            return await mem0.asearch(
+                spec["query"],
+                user_id=user_id,   # ✅ REQUIRED HERE
+                filters=spec.get("filters"),
+                limit=max(wanted[m]["limit"] for m in members),
+                **options,
+            )
+
+        results = await asyncio.gather(*(_search(members) for members in groups.values()))
+
+        out: Dict[str, List[Dict]] = {}
+        for members, memories in zip(groups.values(), results):
+            for name in members:
+                out[name] = (memories or [])[: wanted[name]["limit"]]
+        return out
+
+    # -----------------------------
+    # ALL SECTIONS (one request)
+    # -----------------------------
+    async def get_all_insights(
+        self,
+        user_id: str,
+        kinds: Iterable[str] = INSIGHT_KINDS,
+        previous: Optional[Dict[str, Dict]] = None,
+    ) -> Dict[str, Dict]:
+        """
+        Plans every memory query the requested sections need, runs them
+        once and concurrently, then builds the sections in parallel (the hero
+        and deep LLM analyses overlap).
+        """
+        kinds = list(kinds)
+        previous = previous or {}
+        names = {name for kind in kinds for name in SECTION_QUERIES[kind]}
+        memories = await self.fetch_memories(user_id, names)
+
+        builders = {
+            "hero": lambda: self._build_hero(memories["hero"], previous.get("hero")),
+            "data": lambda: self._build_data(memories["preferences"], memories["rhythm"]),
+            "deep": lambda: self._build_deep(memories["deep"], previous.get("deep")),
+        }
+        records = await asyncio.gather(*(builders[kind]() for kind in kinds))
+        return dict(zip(kinds, records))
+
     # -----------------------------
     # HERO INSIGHT
     # -----------------------------
-    async def get_hero_insight(self, user_id: str) -> Dict:
+    async def get_hero_insight(self, user_id: str, previous: Optional[Dict] = None) -> Dict:
         """
         High-level psychological insight based on long-term memory.
         """
+        memories = await self.fetch_memories(user_id, SECTION_QUERIES["hero"])
+        return await self._build_hero(memories["hero"], previous)
 
-        memories = mem0.client.search(
-            query="What are my primary mindset shifts and goal progress?",
-            user_id=user_id,
-            rerank=True,
-            limit=10,
-        )
+    async def _build_hero(self, memories: List[Dict], previous: Optional[Dict]) -> Dict:
+        fingerprint = memory_fingerprint(memories)
+        if previous and previous.get("fingerprint") == fingerprint:
+            return previous
 
         if not memories:
             return {
-                "title": "Quiet Mind",
-                "description": "AWAREN is waiting for more reflections to identify a distinct pattern.",
-                "badge": "ANALYZING",
+                "result": {
+                    "title": "Quiet Mind",
+                    "description": "AWAREN is waiting for more reflections to identify a distinct pattern.",
+                    "badge": "ANALYZING",
+                },
+                "fingerprint": fingerprint,
             }
 
         context = "\n".join(m["memory"] for m in memories if m.get("memory"))
-        return await self._analyze_patterns(context)
+        return {"result": await self._analyze_patterns(context), "fingerprint": fingerprint}
 
     # -----------------------------
     # DATA INSIGHTS
     # -----------------------------
-    async def get_data_insights(self, user_id: str) -> Dict:
+    async def get_data_insights(self, user_id: str, previous: Optional[Dict] = None) -> Dict:
         """
         Structured, non-LLM insights pulled directly from memory.
         """
-        
-
-        raw_prefs = mem0.client.search(
-            query=PromptRepo.insight_memory_queries()["preferences"],
-            user_id=user_id,   # ✅ REQUIRED HERE
-            filters={
-                "categories": {"contains": "preferences"}
-            },
-            limit=5,
-        )
+        memories = await self.fetch_memories(user_id, SECTION_QUERIES["data"])
+        return await self._build_data(memories["preferences"], memories["rhythm"])
 
+    async def _build_data(self, raw_prefs: List[Dict], rhythm: List[Dict]) -> Dict:
         # Optional safety pass (fine to keep)
         preferences = [
             p for p in raw_prefs
             if "preferences" in (p.get("categories") or [])
         ]
 
-        rhythm = mem0.client.search(
-        query=PromptRepo.insight_memory_queries()["hero"],
-        user_id=user_id,   # ✅ REQUIRED HERE
-        filters={
-            "categories": {"contains": "behaviour"}
-        },
-        rerank=True,
-        limit=4,
-    )
-
+        # No LLM here, nothing to skip; fingerprinted for consistency
         return {
-            "preferences": preferences,
-            "rhythm": rhythm,
+            "result": {
+                "preferences": preferences,
+                "rhythm": rhythm,
+            },
+            "fingerprint": memory_fingerprint(raw_prefs, rhythm),
         }
 
     # -----------------------------
@@ -95,27 +219,27 @@ class InsightService:
         raw = await self.llm.invoke(prompt)
 
         # Defensive JSON parsing (kept identical to previous behavior)
-        
+
         clean = raw.replace("```json", "").replace("```", "").strip()
         return json.loads(clean)
-    
+
 
     # -----------------------------
     # INTERNAL: DEEP EXPLORATION
     # -----------------------------
-    async def explore_deep_insights(self, user_id: str) -> Dict:
+    async def explore_deep_insights(self, user_id: str, previous: Optional[Dict] = None) -> Dict:
         """
         Nova-powered psychological pattern extraction.
         """
+        memories = await self.fetch_memories(user_id, SECTION_QUERIES["deep"])
+        return await self._build_deep(memories["deep"], previous)
 
-        deep_memories = mem0.client.search(
-        query="Analyze the transition from my old habits to my new intentional lifestyle",
-        user_id=user_id,
-        filters={"AND": [{"user_id": user_id}, {"categories": {"contains": "behaviour"}}]},
-        rerank=True, 
-        limit=15 # Higher limit for deeper LLM context
-    )
+    async def _build_deep(self, deep_memories: List[Dict], previous: Optional[Dict]) -> Dict:
         print(f"Deep meories: {deep_memories}")
+        fingerprint = memory_fingerprint(deep_memories)
+        if previous and previous.get("fingerprint") == fingerprint:
+            return previous
+
         prompt = PromptRepo.deep_insights(memory_context=deep_memories)
 
         try:
@@ -123,12 +247,59 @@ class InsightService:
             print(f"Response: {response}")
             # Cleaning the response for JSON parsing
             clean = response.replace("```json", "").replace("```", "").strip()
-            return json.loads(clean)
-        
+            return {"result": json.loads(clean), "fingerprint": fingerprint}
+
         except Exception as e:
-            return {
-                "modal_title": "Evolution Sync",
-                "evolution_summary": "Your neural patterns are currently realigning.",
-                "pattern_recognition": "AWAREN is waiting for more consistent data points to finalize this recognition.",
-                "reflection_question": "What does clarity feel like to you right now?"
-            }
+            # Not fingerprinted: the next revalidation retries the LLM
+            return {"result": dict(DEEP_FALLBACK), "fingerprint": None}
+
+    async def stream_deep_insights(
+        self,
+        user_id: str,
+        previous: Optional[Dict] = None,
+    ) -> AsyncGenerator[Dict, None]:
+        """
+        Streaming explore_deep_insights. Yields {"key", "value"} for each
+        JSON field as soon as Nova has generated it, then {"record": ...}.
+        Generation is stopped at the object's closing brace.
+        """
+        memories = await self.fetch_memories(user_id, SECTION_QUERIES["deep"])
+        deep_memories = memories["deep"]
+        fingerprint = memory_fingerprint(deep_memories)
+
+        if previous and previous.get("fingerprint") == fingerprint:
+            for key, value in previous["result"].items():
+                yield {"key": key, "value": value}
+            yield {"record": previous}
+            return
+
+        prompt = PromptRepo.deep_insights(memory_context=deep_memories)
+        parser = JSONObjectStreamParser()
+        result: Dict = {}
+        tokens = self.llm.stream_prompt(prompt)
+        try:
+            async for token in tokens:
+                if token.startswith("[ERROR]"):
+                    raise RuntimeError(token)
+                for key, value in parser.feed(token):
+                    result[key] = value
+                    yield {"key": key, "value": value}
+                if parser.done:
+                    break
+            if not parser.done:
+                raise ValueError("stream ended before the JSON object was closed")
+            record = {"result": result, "fingerprint": fingerprint}
+
+        except Exception as e:
+            # Fields already shown stay; the rest come from the fallback
+            print(f"WARNING: deep insight stream failed: {e!r}")
+            for key, value in DEEP_FALLBACK.items():
+                if key not in result:
+                    yield {"key": key, "value": value}
+            record = {"result": {**DEEP_FALLBACK, **result}, "fingerprint": None}
+
+        finally:
+            # Stops Bedrock right after the closing brace
+            await tokens.aclose()
+
+        yield {"record": record}
@@ -0,0 +1,153 @@
+"""
+Insight precompute worker.
+
+Keeps hero, data and deep insights warm so the insights screen is a cache
+read. Users come from the Redis queue in insight_cache:
+- "activity":    a memory write (debounced)
+- "interactive": a route served a stale insight
+- "scheduled":   every `schedule_seconds`, users active within the window
+
+At most `concurrency` users are computed at once. Each run goes through
+CacheManager.get_or_compute, so it shares the single-flight lock with the
+API workers and skips the LLM when the memory fingerprint is unchanged.
+
+Run as its own process:
+
+    python -m app.services.insights.precompute
+"""
+import asyncio
+import time
+from typing import Optional
+
+from app.config.settings import settings
+from app.services.cache.redis_manager import CacheManager, close_redis, start_invalidation_listener
+from app.services.insights.insight_cache import (
+    ACTIVE_KEY,
+    QUEUE_KEY,
+    WORKER_HEARTBEAT_KEY,
+    insight_key,
+    insight_tags,
+    memories_changed_at,
+    request_precompute,
+)
+from app.services.insights.insight_service import InsightService
+
+HEARTBEAT_SECONDS = 10
+RETRY_DELAY_SECONDS = 300
+
+
+async def precompute_user(service: InsightService, user_id: str):
+    """Brings all three insights up to date for one user."""
+    valid_after = await memories_changed_at(user_id)
+    computations = {
+        "hero": service.get_hero_insight,
+        "data": service.get_data_insights,
+        "deep": service.explore_deep_insights,
+    }
+    await asyncio.gather(*(
+        CacheManager.get_or_compute(
+            insight_key(kind, user_id),
+            lambda previous, compute=compute: compute(user_id=user_id, previous=previous),
+            expire=settings.insight_max_age_seconds,
+            valid_after=valid_after,
+            revalidate="inline",
+            tags=insight_tags(user_id),
+        )
+        for kind, compute in computations.items()
+    ))
+
+
+class InsightPrecomputer:
+    def __init__(
+        self,
+        concurrency: int = 4,
+        poll_seconds: float = 1.0,
+        schedule_seconds: int = 1800,
+        active_window_seconds: int = 7 * 86400,
+    ):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.schedule_seconds = schedule_seconds
+        self.active_window_seconds = active_window_seconds
+        self.service = InsightService()
+        self._running: set = set()
+        self._next_schedule = 0.0
+        self._stopping: Optional[asyncio.Event] = None
+
+        # Metrics
+        self.completed = 0
+        self.failed = 0
+
+    async def run(self):
+        self._stopping = asyncio.Event()
+        heartbeat = asyncio.create_task(self._heartbeat())
+        print(f"Insight precompute worker started (concurrency={self.concurrency})")
+        try:
+            while not self._stopping.is_set():
+                if time.time() >= self._next_schedule:
+                    await self._schedule_active_users()
+
+                free = self.concurrency - len(self._running)
+                due = await CacheManager.zclaim_due(QUEUE_KEY, time.time(), free) if free else []
+                for user_id in due:
+                    task = asyncio.create_task(self._run_user(user_id))
+                    self._running.add(task)
+                    task.add_done_callback(self._running.discard)
+
+                if not due:
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.poll_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            heartbeat.cancel()
+            if self._running:
+                await asyncio.gather(*self._running, return_exceptions=True)
+
+    def stop(self):
+        if self._stopping:
+            self._stopping.set()
+
+    async def _run_user(self, user_id: str):
+        started = time.perf_counter()
+        try:
+            await precompute_user(self.service, user_id)
+            self.completed += 1
+            print(f"Insights precomputed for {user_id} in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            self.failed += 1
+            print(f"ERROR: insight precompute failed for {user_id}: {e!r}")
+            await request_precompute(user_id, "scheduled", delay=RETRY_DELAY_SECONDS)
+
+    async def _schedule_active_users(self):
+        self._next_schedule = time.time() + self.schedule_seconds
+        now = time.time()
+        users = await CacheManager.zrange_since(ACTIVE_KEY, now - self.active_window_seconds)
+        if users:
+            await CacheManager.zadd_many([(QUEUE_KEY, user_id, now, True) for user_id in users])
+            print(f"Insight precompute: scheduled {len(users)} active users")
+
+    async def _heartbeat(self):
+        while True:
+            try:
+                await CacheManager.set(WORKER_HEARTBEAT_KEY, {"at": time.time()}, expire=HEARTBEAT_SECONDS * 3)
+            except Exception as e:
+                print(f"WARNING: precompute heartbeat failed: {e}")
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+
+
+async def main():
+    worker = InsightPrecomputer(
+        concurrency=settings.insight_precompute_concurrency,
+        schedule_seconds=settings.insight_precompute_schedule_seconds,
+        active_window_seconds=settings.insight_active_window_seconds,
+    )
+    start_invalidation_listener()
+    try:
+        await worker.run()
+    finally:
+        await close_redis()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,30 +1,11 @@
-import asyncio
 from typing import AsyncGenerator, List, Dict, Optional
 
 from app.config.settings import settings
 
-from langchain_aws import ChatBedrock
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
-from langchain_core.callbacks import AsyncCallbackHandler
 
-
-# ==============================
-# Internal: Streaming Queue Handler
-# ==============================
-class _QueueCallbackHandler(AsyncCallbackHandler):
-    """
-    Normalizes Bedrock / Nova streaming tokens.
-    Nova may emit structured content blocks instead of strings.
-    """
-
-    def __init__(self, queue: asyncio.Queue):
-        self.queue = queue
-
-    async def on_llm_new_token(self, token, **kwargs) -> None:
-        # Nova can emit: [{"text": "..."}]
-        if isinstance(token, list):
-            token = "".join(part.get("text", "") for part in token)
-        await self.queue.put(str(token))
+from app.services.llm.client_registry import bedrock_clients
+from app.services.llm.streaming import bounded_iter, normalize_content
 
 
 # ==============================
@@ -44,36 +25,26 @@ class BedrockLLM:
         model_id: str = "amazon.nova-lite-v1:0",
         temperature: float = 0.4,
         region_name: Optional[str] = None,
+        stream_buffer_size: Optional[int] = None,
     ):
         self.model_id = model_id
         self.temperature = temperature
         self.region_name = region_name or settings.aws_region
+        self.stream_buffer_size = (
+            settings.llm_stream_buffer_size
+            if stream_buffer_size is None
+            else stream_buffer_size
+        )
 
     # ------------------------------
-    # Streaming Invoke
+    # Message Formatting
     # ------------------------------
-    async def stream(
-        self,
+    @staticmethod
+    def _build_messages(
         system_prompt: str,
         user_input: str,
         history: Optional[List[Dict]] = None,
-    ) -> AsyncGenerator[str, None]:
-        """
-        Streams tokens from Bedrock.
-        Yields ONLY strings (safe for SSE concatenation).
-        """
-
-        queue: asyncio.Queue[str | None] = asyncio.Queue()
-        callback = _QueueCallbackHandler(queue)
-
-        llm = ChatBedrock(
-            model_id=self.model_id,
-            streaming=True,
-            callbacks=[callback],
-            region_name=self.region_name,
-            model_kwargs={"temperature": self.temperature},
-        )
-
+    ) -> list:
         # Nova expects content as list[{"text": "..."}]
         messages = [SystemMessage(content=[{"text": system_prompt}])]
 
@@ -94,24 +65,68 @@ class BedrockLLM:
                     messages.append(AIMessage(content=formatted))
 
         messages.append(HumanMessage(content=[{"text": user_input}]))
+        return messages
+
+    # ------------------------------
+    # Streaming Invoke
+    # ------------------------------
+    async def stream(
+        self,
+        system_prompt: str,
+        user_input: str,
+        history: Optional[List[Dict]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """
+        Streams tokens from Bedrock.
+        Yields ONLY strings (safe for SSE concatenation).
 
-        async def _run():
-            try:
-                await llm.ainvoke(messages)
-            except Exception as e:
-                await queue.put(f"[ERROR] {e}")
-            finally:
-                await queue.put(None)
+        Iterates the model's native stream through a bounded read-ahead
+        buffer: a slow consumer pauses upstream reads. Closing this
+        generator stops the Bedrock stream.
+        """
 
-        task = asyncio.create_task(_run())
+        messages = self._build_messages(system_prompt, user_input, history)
+        tokens = self._stream_messages(messages)
+        try:
+            async for token in tokens:
+                yield token
+        finally:
+            await tokens.aclose()
 
-        while True:
-            token = await queue.get()
-            if token is None:
-                break
-            yield token
+    async def stream_prompt(self, prompt: str) -> AsyncGenerator[str, None]:
+        """
+        Streaming counterpart of invoke(): one self-contained prompt.
+        Same guarantees as stream().
+        """
+        tokens = self._stream_messages([HumanMessage(content=[{"text": prompt}])])
+        try:
+            async for token in tokens:
+                yield token
+        finally:
+            await tokens.aclose()
+
+    async def _stream_messages(self, messages: list) -> AsyncGenerator[str, None]:
+        llm = bedrock_clients.get(
+            self.model_id,
+            self.temperature,
+            self.region_name,
+            streaming=True,
+        )
 
-        await task
+        async def _tokens():
+            async for chunk in llm.astream(messages):
+                token = normalize_content(chunk.content)
+                if token:
+                    yield token
+
+        tokens = bounded_iter(_tokens(), self.stream_buffer_size)
+        try:
+            async for token in tokens:
+                yield token
+        except Exception as e:
+            yield f"[ERROR] {e}"
+        finally:
+            await tokens.aclose()
 
     # ------------------------------
     # Non-Streaming Invoke
@@ -125,16 +140,12 @@ class BedrockLLM:
         Always returns a clean string.
         """
 
-        llm = ChatBedrock(
-            model_id=self.model_id,
-            region_name=self.region_name,
-            model_kwargs={"temperature": self.temperature},
+        llm = bedrock_clients.get(
+            self.model_id,
+            self.temperature,
+            self.region_name,
         )
 
         response = await llm.ainvoke(prompt)
 
-        content = response.content
-        if isinstance(content, list):
-            content = "".join(c.get("text", "") for c in content)
-
-        return str(content).strip()
\ No newline at end of file
+        return normalize_content(response.content).strip()
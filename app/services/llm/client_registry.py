@@ -0,0 +1,133 @@
+"""
+Process-wide registry of warm Bedrock chat clients.
+
+Building a ChatBedrock per call means a new boto3 client, a credential chain
+lookup and a fresh TLS session on every request. The registry keeps:
+- one boto3 `bedrock-runtime` client per region (keep-alive, connection pool)
+- one ChatBedrock per (model_id, temperature, region, streaming) on top of it
+
+Pooled instances carry NO callbacks. Pass callbacks per call instead:
+    llm.ainvoke(messages, config={"callbacks": [handler]})
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+from langchain_aws import ChatBedrock
+
+from app.config.settings import settings
+
+DEFAULT_MODEL_ID = "amazon.nova-lite-v1:0"
+
+# (model_id, temperature, streaming) combinations used by the app today.
+# Warmed at startup so the first request does not pay client setup.
+DEFAULT_WARM_SPECS: Tuple[Tuple[str, float, bool], ...] = (
+    (DEFAULT_MODEL_ID, 0.4, True),
+    (DEFAULT_MODEL_ID, 0.4, False),
+)
+
+ClientKey = Tuple[str, float, str, bool]
+
+
+class BedrockClientRegistry:
+    """
+    Hands out shared, connection-pooled ChatBedrock instances.
+    Thread-safe: clients may be requested from executor threads.
+    """
+
+    def __init__(
+        self,
+        max_pool_connections: int = 50,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+    ):
+        self._boto_config = Config(
+            max_pool_connections=max_pool_connections,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            tcp_keepalive=True,
+            retries={"max_attempts": 3, "mode": "adaptive"},
+        )
+        self._lock = threading.Lock()
+        self._session: Optional[boto3.session.Session] = None
+        self._runtime_clients: Dict[str, object] = {}
+        self._chat_models: Dict[ClientKey, ChatBedrock] = {}
+
+    # ------------------------------
+    # boto3 runtime clients
+    # ------------------------------
+    def _runtime_client(self, region_name: str):
+        client = self._runtime_clients.get(region_name)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._runtime_clients.get(region_name)
+            if client is None:
+                # One Session => credential chain is resolved once per process
+                if self._session is None:
+                    self._session = boto3.session.Session()
+                client = self._session.client(
+                    "bedrock-runtime",
+                    region_name=region_name,
+                    config=self._boto_config,
+                )
+                self._runtime_clients[region_name] = client
+        return client
+
+    # ------------------------------
+    # Chat models
+    # ------------------------------
+    def get(
+        self,
+        model_id: str = DEFAULT_MODEL_ID,
+        temperature: float = 0.4,
+        region_name: Optional[str] = None,
+        streaming: bool = False,
+    ) -> ChatBedrock:
+        """
+        Returns the shared ChatBedrock for this configuration.
+        """
+        region_name = region_name or settings.aws_region
+        key: ClientKey = (model_id, float(temperature), region_name, streaming)
+
+        llm = self._chat_models.get(key)
+        if llm is not None:
+            return llm
+
+        client = self._runtime_client(region_name)
+        with self._lock:
+            llm = self._chat_models.get(key)
+            if llm is None:
+                llm = ChatBedrock(
+                    model_id=model_id,
+                    client=client,
+                    region_name=region_name,
+                    streaming=streaming,
+                    model_kwargs={"temperature": temperature},
+                )
+                self._chat_models[key] = llm
+        return llm
+
+    def warm_up(
+        self,
+        specs: Iterable[Tuple[str, float, bool]] = DEFAULT_WARM_SPECS,
+        region_name: Optional[str] = None,
+    ) -> int:
+        """
+        Pre-builds clients (credentials + endpoint resolution).
+        Blocking: run it off the event loop at startup.
+        """
+        count = 0
+        for model_id, temperature, streaming in specs:
+            self.get(model_id, temperature, region_name, streaming=streaming)
+            count += 1
+        return count
+
+
+bedrock_clients = BedrockClientRegistry(
+    max_pool_connections=settings.bedrock_max_pool_connections,
+    connect_timeout=settings.bedrock_connect_timeout,
+    read_timeout=settings.bedrock_read_timeout,
+)
@@ -0,0 +1,90 @@
+"""
+Incremental parser for a JSON object arriving token by token.
+
+Emits each top-level field as soon as its value is complete, and reports
+when the object's closing brace has arrived, so the caller can stop the
+generation instead of paying for trailing text. Anything before the first
+"{" (e.g. a ```json fence) is ignored.
+"""
+import json
+from typing import Any, List, Tuple
+
+
+class JSONObjectStreamParser:
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0           # next char to scan
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member_start = -1  # start of the current "key": value
+        self._value_start = -1
+        self._key = None
+        self.done = False
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Adds text; returns the (key, value) pairs completed by it.
+        Raises ValueError on malformed JSON.
+        """
+        if self.done:
+            return []
+        self._buf += text
+        fields: List[Tuple[str, Any]] = []
+        buf = self._buf
+
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._member_start = i + 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch == "]":
+                self._depth -= 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finish_member(buf, i, fields)
+                    self.done = True
+                    self._pos = i + 1
+                    return fields
+            elif self._depth == 1 and ch == ":" and self._key is None:
+                self._key = json.loads(buf[self._member_start:i])
+                self._value_start = i + 1
+            elif self._depth == 1 and ch == ",":
+                self._finish_member(buf, i, fields)
+                self._member_start = i + 1
+            i += 1
+
+        self._pos = i
+        return fields
+
+    def _finish_member(self, buf: str, end: int, fields: List[Tuple[str, Any]]):
+        if self._key is None:
+            if buf[self._member_start:end].strip():
+                raise ValueError(f"malformed member: {buf[self._member_start:end]!r}")
+            return  # empty object
+        fields.append((self._key, json.loads(buf[self._value_start:end])))
+        self._key = None
+        self._value_start = -1
+
+    @property
+    def trailing(self) -> str:
+        """Text received after the closing brace (should be empty)."""
+        return self._buf[self._pos:] if self.done else ""
@@ -0,0 +1,93 @@
+"""
+Streaming primitives shared by LLM wrappers.
+Pure asyncio: no LangChain, no settings imports.
+"""
+import asyncio
+from typing import Any, AsyncGenerator, AsyncIterator, TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class _Failure:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def normalize_content(content: Any) -> str:
+    """
+    Flattens Bedrock / Nova message content into plain text.
+    Nova may emit structured blocks: [{"text": "..."}, ...]
+    """
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    return "" if content is None else str(content)
+
+
+async def bounded_iter(
+    source: AsyncIterator[T],
+    maxsize: int = 32,
+) -> AsyncGenerator[T, None]:
+    """
+    Re-yields `source` through a bounded read-ahead buffer.
+
+    - maxsize <= 0: pure pass-through (pull-driven, no extra task)
+    - maxsize > 0: a reader task stays up to `maxsize` items ahead of the
+      consumer, then blocks. A slow consumer therefore stops upstream reads
+      instead of growing memory without limit.
+
+    Closing the generator cancels the reader and closes `source`.
+    """
+    if maxsize <= 0:
+        try:
+            async for item in source:
+                yield item
+        finally:
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        return
+
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def _reader():
+        try:
+            async for item in source:
+                await buffer.put(item)
+        except Exception as e:
+            await buffer.put(_Failure(e))
+            return
+        # Not in `finally`: a cancelled reader must never block on a full buffer
+        await buffer.put(_DONE)
+
+    reader = asyncio.create_task(_reader())
+    try:
+        while True:
+            item = await buffer.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        if not reader.done():
+            reader.cancel()
+            try:
+                await reader
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            try:
+                await aclose()
+            except RuntimeError:
+                # Source still running in the (cancelled) reader task
+                pass
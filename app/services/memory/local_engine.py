@@ -0,0 +1,383 @@
+"""
+In-process vector memory engine (Mem0Wrapper's offline mode).
+
+Used when no mem0 API key is configured. Same call shape as mem0's
+MemoryClient: search / add / get_all / get / delete_all.
+
+Storage, one directory per user:
+- vectors.f32   float32 rows, L2-normalized, appended in place (memory-mapped)
+- offsets.i64   byte offset of each record in records.jsonl (memory-mapped)
+- records.jsonl one JSON record per memory (text, metadata, timestamps)
+
+Search is an exact cosine top-k (matrix @ query + argpartition) over the
+user's memory-mapped matrix; only the k winning records are read from disk.
+Appends touch only the ends of the three files.
+
+The embedder is pluggable: "hashing" (default, no extra dependencies) or
+"package.module:factory" returning an object with `dim` and
+`embed(texts) -> np.ndarray`, e.g. a sentence-transformers adapter.
+"""
+import importlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# ==============================
+# Embedders
+# ==============================
+class HashingEmbedder:
+    """
+    Feature-hashing bag of words + bigrams. Deterministic across processes
+    (crc32, not Python's randomized hash). Lexical, not semantic.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        if not features:
+            return np.zeros(self.dim, dtype=np.float32)
+
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode("utf-8")) for f in features),
+            dtype=np.uint32,
+            count=len(features),
+        )
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+        return np.bincount(hashes % self.dim, weights=signs, minlength=self.dim).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.vstack([self._embed_one(t) for t in texts])
+
+
+def load_embedder(spec: str, dim: int) -> object:
+    if spec in ("", "hashing"):
+        return HashingEmbedder(dim=dim)
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr)
+    return factory()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+# ==============================
+# Filters (subset of mem0's filter language)
+# ==============================
+def _matches(record: Dict, condition: Dict) -> bool:
+    for key, expected in condition.items():
+        if key == "AND":
+            if not all(_matches(record, c) for c in expected):
+                return False
+        elif key == "OR":
+            if not any(_matches(record, c) for c in expected):
+                return False
+        elif key == "user_id":
+            continue  # storage is already per user
+        elif key == "categories":
+            categories = record.get("categories") or []
+            if isinstance(expected, dict):
+                if "contains" in expected and expected["contains"] not in categories:
+                    return False
+                if "in" in expected and not set(expected["in"]) & set(categories):
+                    return False
+            elif expected not in categories:
+                return False
+        else:
+            actual = (record.get("metadata") or {}).get(key)
+            if isinstance(expected, dict) and "in" in expected:
+                if actual not in expected["in"]:
+                    return False
+            elif actual != expected:
+                return False
+    return True
+
+
+# ==============================
+# Per-user index
+# ==============================
+class _UserIndex:
+    def __init__(self, directory: str, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.offsets_path = os.path.join(directory, "offsets.i64")
+        self.records_path = os.path.join(directory, "records.jsonl")
+        self.lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._mapped_count = -1
+
+    @property
+    def count(self) -> int:
+        try:
+            return os.path.getsize(self.offsets_path) // 8
+        except FileNotFoundError:
+            return 0
+
+    def _mapped(self):
+        """(matrix, offsets) memory maps, re-opened after appends."""
+        count = self.count
+        if count != self._mapped_count:
+            if count == 0:
+                self._matrix = np.zeros((0, self.dim), dtype=np.float32)
+                self._offsets = np.zeros(0, dtype=np.int64)
+            else:
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim))
+                self._offsets = np.memmap(self.offsets_path, dtype=np.int64, mode="r", shape=(count,))
+            self._mapped_count = count
+        return self._matrix, self._offsets
+
+    def append(self, vectors: np.ndarray, records: List[Dict], id_prefix: str) -> List[Dict]:
+        """
+        Ids are "{id_prefix}:{position}", assigned under the lock so that
+        concurrent appends for one user never hand out the same position.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self.lock:
+            base = self.count
+            for i, record in enumerate(records):
+                record["id"] = f"{id_prefix}:{base + i}"
+            # Records first, offsets last: offsets define the visible count,
+            # so a crash mid-append never exposes a half-written row.
+            with open(self.records_path, "ab") as f:
+                offsets = []
+                for record in records:
+                    offsets.append(f.tell())
+                    f.write(json.dumps(record).encode("utf-8") + b"\n")
+            with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "wb") as f:
+                f.seek(self.count * self.dim * 4)
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self.offsets_path, "ab") as f:
+                f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+        return records
+
+    def read_records(self, positions) -> List[Dict]:
+        _, offsets = self._mapped()
+        out = []
+        with open(self.records_path, "rb") as f:
+            for pos in positions:
+                f.seek(int(offsets[pos]))
+                out.append(json.loads(f.readline()))
+        return out
+
+    def iter_records(self, start: int = 0):
+        if not os.path.exists(self.records_path):
+            return
+        _, offsets = self._mapped()
+        # Seek every record through its offset: a crash between the records
+        # and offsets writes leaves an orphan line that must stay invisible
+        with open(self.records_path, "rb") as f:
+            for pos in range(start, len(offsets)):
+                f.seek(int(offsets[pos]))
+                yield json.loads(f.readline())
+
+
+# ==============================
+# Engine
+# ==============================
+class LocalMemoryEngine:
+    """
+    Thread-safe for the Mem0Wrapper executor: appends are serialized per
+    user, searches read immutable memory maps.
+    """
+
+    def __init__(self, root_dir: str, embedder=None, dim: int = 384):
+        self.root_dir = root_dir
+        self.embedder = embedder or HashingEmbedder(dim=dim)
+        self.dim = self.embedder.dim
+        self._indexes: Dict[str, _UserIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, user_id: str) -> _UserIndex:
+        index = self._indexes.get(user_id)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(user_id)
+                if index is None:
+                    directory = os.path.join(self.root_dir, str(uuid.UUID(str(user_id))))
+                    index = self._indexes[user_id] = _UserIndex(directory, self.dim)
+        return index
+
+    @staticmethod
+    def _public(record: Dict, score: Optional[float] = None) -> Dict:
+        out = dict(record)
+        if score is not None:
+            out["score"] = score
+        return out
+
+    # ------------------------------
+    # Write
+    # ------------------------------
+    def add_vectors(
+        self,
+        user_id: str,
+        texts: List[str],
+        vectors: np.ndarray,
+        metadata: Optional[Dict] = None,
+        categories: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """Appends pre-embedded memories. Also the bulk-import path."""
+        index = self._index(user_id)
+        now = datetime.now(timezone.utc).isoformat()
+        records = [
+            {
+                "id": None,  # assigned by append()
+                "memory": text,
+                "user_id": str(user_id),
+                "categories": list(categories or []),
+                "metadata": dict(metadata or {}),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for text in texts
+        ]
+        return index.append(_normalize(vectors), records, id_prefix=str(user_id))
+
+    def add(self, messages: List[Dict], user_id: str, metadata: Optional[Dict] = None, **options) -> Dict:
+        """
+        Stores each user message as one memory. (mem0 distils facts with an
+        LLM; offline we keep what the user said, verbatim.)
+        """
+        texts = [
+            m.get("content", "").strip()
+            for m in messages
+            if m.get("role") == "user" and isinstance(m.get("content"), str) and m.get("content").strip()
+        ]
+        if not texts:
+            return {"results": []}
+        records = self.add_vectors(
+            user_id,
+            texts,
+            self.embedder.embed(texts),
+            metadata=metadata,
+            categories=(metadata or {}).get("categories"),
+        )
+        return {"results": [{"id": r["id"], "memory": r["memory"], "event": "ADD"} for r in records]}
+
+    # ------------------------------
+    # Read
+    # ------------------------------
+    def search_vector(
+        self,
+        query_vector: np.ndarray,
+        user_id: str,
+        limit: int = 5,
+        filters: Optional[Dict] = None,
+    ) -> List[Dict]:
+        index = self._index(user_id)
+        matrix, _ = index._mapped()
+        count = matrix.shape[0]
+        if count == 0 or limit <= 0:
+            return []
+
+        query = _normalize(np.asarray(query_vector).reshape(1, -1))[0]
+        scores = matrix @ query
+
+        # Filters are checked on candidates only; widen if too few survive
+        candidates = min(count, limit if not filters else limit * 10)
+        while True:
+            if candidates >= count:
+                top = np.argsort(-scores)
+            else:
+                part = np.argpartition(-scores, candidates - 1)[:candidates]
+                top = part[np.argsort(-scores[part])]
+
+            results = []
+            for pos, record in zip(top, index.read_records(top)):
+                if filters and not _matches(record, filters):
+                    continue
+                results.append(self._public(record, float(scores[pos])))
+                if len(results) == limit:
+                    return results
+            if candidates >= count:
+                return results
+            candidates = min(count, candidates * 4)
+
+    def search(
+        self,
+        query: str,
+        user_id: str,
+        limit: int = 5,
+        filters: Optional[Dict] = None,
+        **options,
+    ) -> List[Dict]:
+        """Cosine top-k. mem0-only options (rerank, ...) are ignored."""
+        return self.search_vector(self.embedder.embed([query])[0], user_id, limit, filters)
+
+    def get_all(self, user_id: str, filters: Optional[Dict] = None, **options) -> List[Dict]:
+        return [
+            self._public(r)
+            for r in self._index(user_id).iter_records()
+            if not filters or _matches(r, filters)
+        ]
+
+    def get_page(
+        self,
+        user_id: str,
+        after: int = 0,
+        page_size: int = 20,
+        filters: Optional[Dict] = None,
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Up to `page_size` memories from position `after` on, plus the
+        position to continue from (None at the end). Positions never move
+        (append-only), so pages stay consistent while memories are added.
+        """
+        index = self._index(user_id)
+        if not filters:
+            end = min(index.count, after + page_size)
+            records = index.read_records(range(after, end)) if end > after else []
+            return [self._public(r) for r in records], (end if end < index.count else None)
+
+        page: List[Dict] = []
+        position = after
+        for record in index.iter_records(after):
+            if _matches(record, filters):
+                if len(page) == page_size:
+                    return page, position  # next page starts at this match
+                page.append(self._public(record))
+            position += 1
+        return page, None
+
+    def get(self, memory_id: str, user_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        Ids are "{user_id}:{position}", so they are guessable: pass the
+        caller's `user_id` and another user's memory reads as not found.
+        """
+        owner, _, pos = memory_id.rpartition(":")
+        if user_id is not None and owner != str(user_id):
+            return None
+        user_id = owner
+        try:
+            index = self._index(user_id)
+            pos = int(pos)
+        except ValueError:
+            return None
+        if not 0 <= pos < index.count:
+            return None
+        return self._public(index.read_records([pos])[0])
+
+    def delete_all(self, user_id: str, **options) -> Dict:
+        index = self._index(user_id)
+        with index.lock:
+            shutil.rmtree(index.directory, ignore_errors=True)
+            index._mapped_count = -1
+        return {"message": "Memories deleted successfully!"}
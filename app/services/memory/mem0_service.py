@@ -3,11 +3,20 @@ Wrapper around mem0 usage.
 
 This file provides two patterns:
 1) Using a remote MemoryClient with an API key (MemoryClient)
-2) Using Memory.from_config with a LangChain model instance (in-process)
+2) Without a key, the in-process LocalMemoryEngine (local_engine.py), which
+   exposes the same search/add/get_all/get/delete_all calls
 
 Replace the placeholders with your actual mem0 usage and configuration.
+
+Async callers (routes, services) must use the `a*` methods: the mem0 SDK is
+synchronous, so they run it on a small dedicated thread pool with a per-call
+timeout instead of blocking the event loop.
 """
-from typing import List, Dict, Optional
+import asyncio
+import functools
+import math
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from app.config.settings import settings
 
 # Try to import MemoryClient from mem0 SDK if available
@@ -17,27 +26,177 @@ except Exception:
     MemoryClient = None
     Memory = None
 
+# Offline engine needs numpy
+try:
+    from app.services.memory.local_engine import LocalMemoryEngine, load_embedder
+except Exception:
+    LocalMemoryEngine = None
+
 class Mem0Wrapper:
     def __init__(self):
         # If you have a remote mem0 instance and API key, use MemoryClient
         if MemoryClient and settings.mem0_api_key:
             self.client = MemoryClient(api_key=settings.mem0_api_key)
             self.mode = "client"
+        elif LocalMemoryEngine:
+            # No key: local vector engine, so long-term context still works offline
+            self.client = LocalMemoryEngine(
+                settings.local_memory_dir,
+                embedder=load_embedder(settings.local_memory_embedder, settings.local_memory_dim),
+            )
+            self.mode = "local"
         else:
-            # As fallback, use in-process Memory if available (requires Memory.from_config)
             self.client = None
             self.mode = "none"
 
+        # Bounded: a slow mem0 can tie up at most this many threads
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.mem0_max_workers,
+            thread_name_prefix="mem0",
+        )
+        self.timeout = settings.mem0_timeout_seconds
+
     def search(self, query: str, user_id: str, limit: int = 5, filters: Optional[Dict] = None) -> List[Dict]:
         """Return list of memory dicts: [{'memory': '...', 'score': 0.9}, ...]"""
-        if self.mode == "client":
+        if self.client is not None:
             return self.client.search(query, user_id=user_id, limit=limit, filters=filters)
         # Fallback: return empty list so the app still works offline
         return []
 
     def add(self, messages: List[Dict], user_id: str, metadata: Optional[Dict] = None):
-        if self.mode == "client":
+        if self.client is not None:
             return self.client.add(messages, user_id=user_id, metadata=metadata or {})
         return None
 
+    # ------------------------------
+    # Async API (event-loop safe)
+    # ------------------------------
+    async def _run(self, fn, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Runs a blocking SDK call on the mem0 pool.
+        Raises asyncio.TimeoutError after `timeout` (default: settings).
+        timeout=math.inf waits for the call however long it takes: a timed
+        out call keeps running on its thread, so a caller that would retry
+        it (a write) must not give up on it.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        timeout = timeout or self.timeout
+        if timeout == math.inf:
+            return await future
+        return await asyncio.wait_for(future, timeout)
+
+    async def asearch(
+        self,
+        query: str,
+        user_id: str,
+        limit: int = 5,
+        filters: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+        **options,
+    ) -> List[Dict]:
+        """Async search. Extra options (e.g. rerank=True) go to the SDK."""
+        if self.client is None:
+            return []
+        if filters is not None:
+            options["filters"] = filters
+        return await self._run(
+            self.client.search, query, user_id=user_id, limit=limit, timeout=timeout, **options
+        )
+
+    async def aadd(
+        self,
+        messages: List[Dict],
+        user_id: str,
+        metadata: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ):
+        if self.client is None:
+            return None
+        return await self._run(
+            self.client.add, messages, user_id=user_id, metadata=metadata or {}, timeout=timeout
+        )
+
+    async def aget_all(self, user_id: str, timeout: Optional[float] = None, **options) -> List[Dict]:
+        if self.client is None:
+            return []
+        return await self._run(self.client.get_all, user_id=user_id, timeout=timeout, **options)
+
+    def get_page(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        page_size: int = 20,
+        filters: Optional[Dict] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of the user's memories and the cursor of the next one (None
+        at the end). Cursors are backend-specific: a page number for the
+        mem0 platform, a storage position for the local engine.
+        """
+        if self.client is None:
+            return [], None
+        if self.mode == "local":
+            records, after = self.client.get_page(user_id, int(cursor or 0), page_size, filters)
+            return records, (str(after) if after is not None else None)
+
+        page = int(cursor or 1)
+        clauses = [{"user_id": user_id}] + ([filters] if filters else [])
+        response = self.client.get_all(filters={"AND": clauses}, page=page, page_size=page_size)
+        if isinstance(response, list):
+            # SDKs without server-side paging return everything
+            start = (page - 1) * page_size
+            records = response[start:start + page_size]
+            has_more = len(response) > start + page_size
+        else:
+            records = response.get("results") or []
+            has_more = bool(response.get("next"))
+        return records, (str(page + 1) if has_more else None)
+
+    async def aget_page(
+        self,
+        user_id: str,
+        cursor: Optional[str] = None,
+        page_size: int = 20,
+        filters: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        return await self._run(self.get_page, user_id, cursor, page_size, filters, timeout=timeout)
+
+    async def aiter_all(
+        self,
+        user_id: str,
+        filters: Optional[Dict] = None,
+        page_size: int = 200,
+    ) -> AsyncIterator[Dict]:
+        """Every memory of the user, one page in memory at a time."""
+        cursor = None
+        while True:
+            records, cursor = await self.aget_page(user_id, cursor, page_size, filters)
+            for record in records:
+                yield record
+            if cursor is None:
+                return
+
+    async def aget(
+        self,
+        memory_id: str,
+        user_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Optional[Dict]:
+        """With `user_id`, another user's memory is returned as None."""
+        if self.client is None:
+            return None
+        if self.mode == "local":
+            return await self._run(self.client.get, memory_id=memory_id, user_id=user_id, timeout=timeout)
+        memory = await self._run(self.client.get, memory_id=memory_id, timeout=timeout)
+        if memory and user_id is not None and memory.get("user_id") != user_id:
+            return None
+        return memory
+
+    async def adelete_all(self, user_id: str, timeout: Optional[float] = None, **options):
+        if self.client is None:
+            return None
+        return await self._run(self.client.delete_all, user_id=user_id, timeout=timeout, **options)
+
 mem0 = Mem0Wrapper()
@@ -0,0 +1,117 @@
+"""
+Paged listing of a user's memories (/memory/all).
+
+Paging and the category filter are pushed down to mem0 (see
+Mem0Wrapper.get_page). Each page is cached under its own key, tagged with
+the user's memory set, so a write-behind flush drops every page at once.
+
+Cursors are opaque to clients: base64 of the backend cursor plus the
+category it was issued for, so a cursor cannot be replayed against another
+filter.
+"""
+import base64
+import binascii
+import hashlib
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from app.services.cache.redis_manager import cached
+from app.services.cache.tags import memory_set_tag, user_tag
+from app.services.memory.mem0_service import mem0
+
+PAGE_CACHE_SECONDS = 3600
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def normalize_memory(m: Dict) -> Dict:
+    raw_categories = m.get("categories", []) or []
+    clean_categories = [
+        cat.split(":")[-1].strip().capitalize() if ":" in cat else cat.capitalize()
+        for cat in raw_categories
+    ]
+    return {
+        "id": m.get("id"),
+        "memory": m.get("memory") or m.get("content"),
+        "score": m.get("score", 1.0),
+        "categories": clean_categories or ["Fragment"],
+    }
+
+
+def category_filter(category: Optional[str]) -> Optional[Dict]:
+    return {"categories": {"contains": category}} if category else None
+
+
+# -----------------------------
+# CURSORS
+# -----------------------------
+def encode_cursor(backend_cursor: Optional[str], category: Optional[str]) -> Optional[str]:
+    if backend_cursor is None:
+        return None
+    raw = json.dumps({"c": backend_cursor, "f": category}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], category: Optional[str]) -> Optional[str]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError):
+        raise InvalidCursor("Malformed cursor.")
+    if not isinstance(payload, dict) or payload.get("f") != category:
+        raise InvalidCursor("Cursor was issued for a different category.")
+    backend_cursor = payload.get("c")
+    # Local engine: a storage position (>= 0); mem0 platform: a page (>= 1)
+    lowest = 0 if mem0.mode == "local" else 1
+    if not (isinstance(backend_cursor, str) and backend_cursor.isascii() and backend_cursor.isdigit()
+            and int(backend_cursor) >= lowest):
+        raise InvalidCursor("Malformed cursor.")
+    return backend_cursor
+
+
+# -----------------------------
+# PAGES
+# -----------------------------
+def _page_key(user_id: str, backend_cursor: Optional[str], page_size: int, category: Optional[str]) -> str:
+    digest = hashlib.sha1(json.dumps([backend_cursor, page_size, category]).encode()).hexdigest()[:16]
+    return f"memories:page:{user_id}:{digest}"
+
+
+@cached(
+    key=_page_key,
+    tags=lambda user_id, *args: [user_tag(user_id), memory_set_tag(user_id)],
+    expire=PAGE_CACHE_SECONDS,
+)
+async def _load_page(
+    user_id: str,
+    backend_cursor: Optional[str],
+    page_size: int,
+    category: Optional[str],
+) -> Dict:
+    records, next_cursor = await mem0.aget_page(
+        user_id, backend_cursor, page_size, category_filter(category)
+    )
+    return {"items": [normalize_memory(m) for m in records], "next": next_cursor}
+
+
+async def load_memory_page(
+    user_id: str,
+    cursor: Optional[str] = None,
+    page_size: int = 20,
+    category: Optional[str] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """(memories, next cursor). Raises InvalidCursor."""
+    category = category.lower() if category else None
+    page = await _load_page(user_id, decode_cursor(cursor, category), page_size, category)
+    return page["items"], encode_cursor(page["next"], category)
+
+
+async def iter_memories_ndjson(user_id: str, category: Optional[str] = None) -> AsyncIterator[str]:
+    """Every memory as one JSON line; uncached, one mem0 page held at a time."""
+    category = category.lower() if category else None
+    async for m in mem0.aiter_all(user_id, category_filter(category)):
+        yield json.dumps(normalize_memory(m)) + "\n"
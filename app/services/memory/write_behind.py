@@ -0,0 +1,326 @@
+"""
+Write-behind queue for mem0.add.
+
+Chat turns are buffered per (user_id, conversation_id) and sent to mem0 as
+one batched add once a buffer holds `max_batch_turns` turns or its oldest
+turn is `flush_interval_seconds` old.
+
+Every turn is first written to a local SQLite spool and deleted only after
+mem0 accepted it, so a restart or crash loses nothing: spooled rows are
+replayed on start. Rows record the pid that queued them; a process only
+adopts rows whose owner is no longer alive, so several workers on one host
+can share the spool file.
+"""
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import settings
+from app.services.memory.mem0_service import mem0
+from app.services.insights.insight_cache import mark_insights_dirty
+from app.services.cache.redis_manager import CacheManager
+from app.services.cache.tags import memory_set_tag
+
+BufferKey = Tuple[str, str]  # (user_id, conversation_id)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _Spool:
+    """Blocking SQLite access. Call through asyncio.to_thread."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS mem0_spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " owner_pid INTEGER NOT NULL,"
+            " user_id TEXT NOT NULL,"
+            " conversation_id TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def append(self, user_id: str, conversation_id: str, payload: Dict) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO mem0_spool (owner_pid, user_id, conversation_id, payload, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (os.getpid(), user_id, conversation_id, json.dumps(payload), time.time()),
+            )
+            self._conn.commit()
+            return cur.lastrowid
+
+    def delete(self, row_ids: List[int]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM mem0_spool WHERE id = ?", [(i,) for i in row_ids])
+            self._conn.commit()
+
+    def adopt_orphans(self) -> List[Tuple[int, str, str, Dict, float]]:
+        """Claims rows left by dead processes (including a previous run of us)."""
+        me = os.getpid()
+        with self._lock:
+            owners = [
+                row[0]
+                for row in self._conn.execute("SELECT DISTINCT owner_pid FROM mem0_spool")
+            ]
+            dead = [pid for pid in owners if pid == me or not _pid_alive(pid)]
+            for pid in dead:
+                self._conn.execute("UPDATE mem0_spool SET owner_pid = ? WHERE owner_pid = ?", (me, pid))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id, user_id, conversation_id, payload, created_at"
+                " FROM mem0_spool WHERE owner_pid = ? ORDER BY id",
+                (me,),
+            ).fetchall()
+        return [(r[0], r[1], r[2], json.loads(r[3]), r[4]) for r in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class _Buffer:
+    __slots__ = ("row_ids", "turns", "first_at", "retry_at", "failures", "flushing")
+
+    def __init__(self):
+        self.row_ids: List[int] = []
+        self.turns: List[Dict] = []
+        self.first_at = 0.0
+        self.retry_at = 0.0
+        self.failures = 0
+        self.flushing = False
+
+
+class MemoryWriteBehind:
+    """
+    Process-wide write-behind pipeline (module singleton below).
+    """
+
+    def __init__(
+        self,
+        spool_path: str,
+        max_batch_turns: int = 5,
+        flush_interval_seconds: float = 30.0,
+        max_retry_delay: float = 300.0,
+    ):
+        self.spool_path = spool_path
+        self.max_batch_turns = max_batch_turns
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_retry_delay = max_retry_delay
+
+        self._spool: Optional[_Spool] = None
+        self._buffers: Dict[BufferKey, _Buffer] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self._start_lock = asyncio.Lock()
+
+        # Metrics
+        self._flushes = 0
+        self._flush_errors = 0
+        self._turns_flushed = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    # ------------------------------
+    # Lifecycle
+    # ------------------------------
+    async def start(self):
+        async with self._start_lock:
+            if self._spool is not None:
+                return
+            spool = await asyncio.to_thread(_Spool, self.spool_path)
+
+            recovered = await asyncio.to_thread(spool.adopt_orphans)
+            for row_id, user_id, conversation_id, payload, created_at in recovered:
+                self._buffer_turn((user_id, conversation_id), row_id, payload, created_at)
+            if recovered:
+                print(f"mem0 write-behind: recovered {len(recovered)} spooled turns")
+
+            self._spool = spool
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stops the timer loop and makes a last attempt to flush everything."""
+        if self._flusher:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        try:
+            # Shielded: a flush cut off after mem0 accepted its batch would
+            # leave the rows spooled, and they would be replayed as duplicates
+            await asyncio.wait_for(asyncio.shield(self.flush_all()), timeout)
+        except asyncio.TimeoutError:
+            print("WARNING: mem0 write-behind stop timed out; turns stay spooled")
+        if self._inflight:
+            # Still waiting on mem0; they delete their rows when it answers,
+            # so the spool stays open
+            return
+        if self._spool:
+            await asyncio.to_thread(self._spool.close)
+            self._spool = None
+
+    # ------------------------------
+    # Producer side
+    # ------------------------------
+    async def enqueue(
+        self,
+        user_id: str,
+        conversation_id: str,
+        messages: List[Dict],
+        metadata: Optional[Dict] = None,
+    ):
+        """
+        Durably queues one chat turn. Returns once it is spooled, not sent.
+        """
+        if self._spool is None:
+            await self.start()
+
+        payload = {"messages": messages, "metadata": metadata or {}}
+        key = (user_id, conversation_id)
+        row_id = await asyncio.to_thread(self._spool.append, user_id, conversation_id, payload)
+        buffer = self._buffer_turn(key, row_id, payload, time.time())
+
+        if len(buffer.turns) >= self.max_batch_turns:
+            self._spawn_flush(key)
+
+    def _buffer_turn(self, key: BufferKey, row_id: int, payload: Dict, created_at: float) -> _Buffer:
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = _Buffer()
+        if not buffer.turns:
+            buffer.first_at = created_at
+        buffer.row_ids.append(row_id)
+        buffer.turns.append(payload)
+        return buffer
+
+    # ------------------------------
+    # Flushing
+    # ------------------------------
+    def _spawn_flush(self, key: BufferKey):
+        task = asyncio.create_task(self._flush_key(key))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _flush_loop(self):
+        tick = max(0.5, min(5.0, self.flush_interval_seconds / 4))
+        while True:
+            await asyncio.sleep(tick)
+            now = time.time()
+            for key, buffer in list(self._buffers.items()):
+                if (
+                    buffer.turns
+                    and not buffer.flushing
+                    and now >= buffer.retry_at
+                    and now - buffer.first_at >= self.flush_interval_seconds
+                ):
+                    self._spawn_flush(key)
+
+    async def flush_all(self):
+        # Through _spawn_flush, so that stop() can see every running flush
+        for key in list(self._buffers):
+            self._spawn_flush(key)
+        while self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+    async def _flush_key(self, key: BufferKey):
+        buffer = self._buffers.get(key)
+        if buffer is None or buffer.flushing or not buffer.turns:
+            return
+
+        # Snapshot: turns arriving during the flush go into the next batch
+        buffer.flushing = True
+        row_ids, turns = buffer.row_ids, buffer.turns
+        buffer.row_ids, buffer.turns = [], []
+
+        user_id, conversation_id = key
+        messages = [m for turn in turns for m in turn["messages"]]
+        metadata = dict(turns[-1]["metadata"])
+        metadata["batched_turns"] = len(turns)
+        if any(turn["metadata"].get("truncated") for turn in turns):
+            metadata["truncated"] = True
+
+        started = time.perf_counter()
+        try:
+            # No timeout: a timed-out add still runs on its thread and usually
+            # lands, so re-sending the batch would add the turns twice
+            await mem0.aadd(messages, user_id=user_id, metadata=metadata, timeout=math.inf)
+            await asyncio.to_thread(self._spool.delete, row_ids)
+        except Exception as e:
+            # Put the batch back in front; rows are still spooled
+            buffer.row_ids = row_ids + buffer.row_ids
+            buffer.turns = turns + buffer.turns
+            buffer.failures += 1
+            buffer.retry_at = time.time() + min(self.max_retry_delay, 2 ** buffer.failures)
+            self._flush_errors += 1
+            print(f"ERROR: mem0 batched add failed ({len(turns)} turns, user {user_id}): {e}")
+            return
+        finally:
+            buffer.flushing = False
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._flushes += 1
+        self._turns_flushed += len(turns)
+        self._last_flush_ms = elapsed_ms
+        self._max_flush_ms = max(self._max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+        # The batch is in mem0 only now: stale insights and memory list again
+        try:
+            await mark_insights_dirty(user_id)
+            await CacheManager.invalidate_tags(memory_set_tag(user_id))
+        except Exception as e:
+            print(f"WARNING: memory caches not invalidated for {user_id}: {e}")
+
+        buffer.failures = 0
+        buffer.retry_at = 0.0
+        if not buffer.turns:
+            self._buffers.pop(key, None)
+        elif len(buffer.turns) >= self.max_batch_turns:
+            self._spawn_flush(key)
+
+    # ------------------------------
+    # Metrics
+    # ------------------------------
+    def stats(self) -> Dict:
+        return {
+            "queue_depth": sum(len(b.turns) for b in self._buffers.values()),
+            "pending_buffers": len(self._buffers),
+            "flushes": self._flushes,
+            "flush_errors": self._flush_errors,
+            "turns_flushed": self._turns_flushed,
+            "last_flush_ms": round(self._last_flush_ms, 1),
+            "max_flush_ms": round(self._max_flush_ms, 1),
+            "avg_flush_ms": round(self._total_flush_ms / self._flushes, 1) if self._flushes else 0.0,
+        }
+
+
+memory_writer = MemoryWriteBehind(
+    spool_path=settings.mem0_write_spool_path,
+    max_batch_turns=settings.mem0_write_batch_turns,
+    flush_interval_seconds=settings.mem0_write_flush_seconds,
+)
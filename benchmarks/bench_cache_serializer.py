@@ -0,0 +1,118 @@
+"""
+Encode/decode time and stored bytes of the cache serializer
+(app/services/cache/serializer.py) for realistic cached values:
+
+- "title":     a conversation title ({"title": ...}), ~60 bytes
+- "insight":   a deep insight get_or_compute envelope
+- "memories":  get_all_memories for a long-time user (`--memories` items,
+               mem0's record shape: id, text, categories, metadata, dates)
+
+Every format x compression pair is timed with --repeat runs; "legacy" is
+the previous json.dumps text, for reference.
+
+    python -m benchmarks.bench_cache_serializer [--memories 2000 --repeat 200]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+from app.services.cache.serializer import CacheSerializer, _compressions, _formats
+
+PHRASES = [
+    "User prefers running in the morning before classes",
+    "Feels anxious before exams and sleeps badly the night before",
+    "Enjoys cooking dinner with their sister on Sundays",
+    "Is trying to reduce screen time after 10pm",
+    "Journals when stressed; finds it calming",
+    "Works long meetings on Tuesdays and feels drained afterwards",
+]
+CATEGORIES = ["preferences", "behaviour", "health", "relationships", "work"]
+
+
+def memories_payload(count: int) -> dict:
+    rng = random.Random(0)
+    results = []
+    for i in range(count):
+        day = f"2025-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:{i % 60:02d}:00.000000-07:00"
+        results.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "memory": f"{rng.choice(PHRASES)} (noted {i})",
+            "user_id": "7c9e6679-7425-40de-944b-e07fc1f90ae7",
+            "categories": rng.sample(CATEGORIES, rng.randint(1, 2)),
+            "metadata": {
+                "app_id": "awaren_ai",
+                "conversation_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "truncated": False,
+            },
+            "created_at": day,
+            "updated_at": day,
+            "score": round(rng.random(), 4),
+        })
+    return {"results": results}
+
+
+def insight_payload() -> dict:
+    now = time.time()
+    return {
+        "value": {
+            "result": {
+                "modal_title": "From Rush to Rhythm",
+                "evolution_summary": "Over the last months your mornings moved from reactive scrolling "
+                                     "to a deliberate run and a short journal entry. " * 2,
+                "pattern_recognition": "On days that start with movement you report calmer exam prep "
+                                       "and fewer late-night sessions. " * 2,
+                "reflection_question": "What would protecting your mornings look like during exam week?",
+            },
+            "fingerprint": "3f786850e387550fdab836ed7e6dc881de23001b",
+        },
+        "fresh_until": now + 86400,
+        "computed_at": now,
+    }
+
+
+def _time(fn, arg, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main(args):
+    payloads = {
+        "title": {"title": "Morning runs and exam stress"},
+        "insight": insight_payload(),
+        "memories": memories_payload(args.memories),
+    }
+    codecs = [
+        (fmt, comp)
+        for fmt in _formats()
+        for comp in _compressions(6, 3)
+    ]
+
+    for name, payload in payloads.items():
+        repeat = max(5, args.repeat // 20) if name == "memories" else args.repeat
+        legacy = json.dumps(payload).encode()
+        print(f"\n{name}: legacy json {len(legacy):,} B")
+        print(f"  {'format':<8} {'compress':<9} {'bytes':>10} {'ratio':>6} {'encode us':>10} {'decode us':>10}")
+        legacy_enc = _time(lambda v: json.dumps(v).encode(), payload, repeat)
+        legacy_dec = _time(json.loads, legacy, repeat)
+        print(f"  {'legacy':<8} {'-':<9} {len(legacy):>10,} {1.0:>6.2f} {legacy_enc:>10.1f} {legacy_dec:>10.1f}")
+
+        for fmt, comp in codecs:
+            serializer = CacheSerializer(fmt, comp, compress_min_bytes=args.min_bytes)
+            data = serializer.encode(payload)
+            assert serializer.decode(data) == json.loads(legacy)
+            enc = _time(serializer.encode, payload, repeat)
+            dec = _time(serializer.decode, data, repeat)
+            ratio = len(legacy) / len(data)
+            print(f"  {fmt:<8} {comp:<9} {len(data):>10,} {ratio:>6.2f} {enc:>10.1f} {dec:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--memories", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--min-bytes", type=int, default=1024)
+    main(parser.parse_args())
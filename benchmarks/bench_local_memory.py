@@ -0,0 +1,93 @@
+"""
+Search latency of the offline memory engine (LocalMemoryEngine) as one
+user's memory count grows.
+
+For each size, memories are bulk-appended with random unit vectors (the
+embedder is only used for the query), then `--queries` searches are timed.
+"filtered" adds an app_id filter, which is checked on candidates only.
+
+    python -m benchmarks.bench_local_memory [--sizes 1000,10000,100000,1000000 --dim 384]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+from app.services.memory.local_engine import LocalMemoryEngine
+
+QUERIES = [
+    "I have been sleeping badly before exams",
+    "my morning run makes me feel calm",
+    "work stress and long meetings",
+    "I love cooking dinner with my sister",
+]
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def build(engine, user_id, size, dim, chunk=50_000):
+    rng = np.random.default_rng(0)
+    written = 0
+    while written < size:
+        n = min(chunk, size - written)
+        texts = [f"memory {written + i}" for i in range(n)]
+        engine.add_vectors(user_id, texts, rng.standard_normal((n, dim), dtype=np.float32),
+                           metadata={"app_id": "awaren_ai"})
+        written += n
+
+
+def time_searches(engine, user_id, queries, limit, filters=None):
+    samples = []
+    for i in range(queries):
+        t0 = time.perf_counter()
+        engine.search(QUERIES[i % len(QUERIES)], user_id=user_id, limit=limit, filters=filters)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def main(args):
+    sizes = [int(s) for s in args.sizes.split(",")]
+    root = tempfile.mkdtemp(prefix="bench_local_memory_")
+    print(f"dim={args.dim} limit={args.limit} queries={args.queries} dir={root}\n")
+    print(f"{'memories':>10} {'build s':>8} {'disk MB':>8} {'cold ms':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'filtered p50':>13}")
+    try:
+        for size in sizes:
+            engine = LocalMemoryEngine(root, dim=args.dim)
+            user_id = str(uuid.uuid4())
+
+            t0 = time.perf_counter()
+            build(engine, user_id, size, args.dim)
+            build_s = time.perf_counter() - t0
+
+            user_dir = os.path.join(root, user_id)
+            disk_mb = sum(os.path.getsize(os.path.join(user_dir, f)) for f in os.listdir(user_dir)) / 1e6
+
+            cold = time_searches(engine, user_id, 1, args.limit)[0]
+            warm = time_searches(engine, user_id, args.queries, args.limit)
+            filtered = time_searches(engine, user_id, args.queries, args.limit,
+                                     filters={"AND": [{"user_id": user_id}, {"app_id": "awaren_ai"}]})
+
+            print(f"{size:>10,} {build_s:>8.2f} {disk_mb:>8.1f} {cold:>8.2f} "
+                  f"{statistics.median(warm):>8.2f} {_percentile(warm, 0.95):>8.2f} "
+                  f"{statistics.median(filtered):>13.2f}")
+            shutil.rmtree(user_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,135 @@
+"""
+Message history reads on long conversations: the old full load
+(get_last_n_messages(n=99999), ORM objects) versus keyset pages
+(get_messages_page), with and without the composite
+(conversation_id, timestamp, id) index. OFFSET paging is shown for the
+same deep page.
+
+The table holds one long conversation per size plus `--noise`
+conversations of 200 messages each. Runs on SQLite by default; pass a
+postgresql+asyncpg URL to measure Postgres (tables are created and dropped).
+
+    python -m benchmarks.bench_message_pages [--sizes 10000,50000 --page 50 --database-url ...]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import desc, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.db import Base
+from app.models import chat, user  # noqa: F401  (registers the tables)
+from app.models.chat import ChatHistory, Conversation
+from app.services.conversations.conversations_service import get_last_n_messages, get_messages_page
+
+INDEX = "ix_chat_history_conversation_timestamp_id"
+
+
+async def _fill(session, conversation_id, user_id, count, start):
+    rows = [
+        {
+            "user_id": user_id,
+            "conversation_id": conversation_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"message {i} " + "lorem ipsum dolor sit amet " * 8,
+            "timestamp": start + timedelta(seconds=i),
+            "truncated": False,
+        }
+        for i in range(count)
+    ]
+    for chunk in range(0, len(rows), 5000):
+        await session.execute(insert(ChatHistory), rows[chunk:chunk + 5000])
+
+
+async def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+async def _offset_page(session, conversation_id, offset, limit):
+    stmt = (
+        select(ChatHistory.id, ChatHistory.role, ChatHistory.content, ChatHistory.timestamp)
+        .where(ChatHistory.conversation_id == conversation_id)
+        .order_by(desc(ChatHistory.timestamp), desc(ChatHistory.id))
+        .offset(offset)
+        .limit(limit)
+    )
+    return (await session.execute(stmt)).all()
+
+
+async def run(args):
+    url = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    engine = create_async_engine(url)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    user_id = uuid.uuid4()
+    start = datetime(2025, 1, 1)
+    conversations = {}
+    async with Session() as session:
+        for size in sizes:
+            conversations[size] = uuid.uuid4()
+            session.add(Conversation(id=conversations[size], user_id=user_id, title=f"{size}"))
+        noise = [uuid.uuid4() for _ in range(args.noise)]
+        for conversation_id in noise:
+            session.add(Conversation(id=conversation_id, user_id=user_id, title="noise"))
+        await session.flush()
+        for size, conversation_id in conversations.items():
+            await _fill(session, conversation_id, user_id, size, start)
+        for conversation_id in noise:
+            await _fill(session, conversation_id, user_id, 200, start)
+        await session.commit()
+    print(f"{url.split(':')[0]}  page={args.page}  noise={args.noise}x200 messages\n")
+
+    for with_index in (True, False):
+        if not with_index:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP INDEX {INDEX}"))
+        label = "composite index" if with_index else "single-column indexes only"
+        print(f"-- {label}")
+        print(f"  {'messages':>9} {'full load ms':>13} {'latest page':>12} {'deep keyset':>12} {'deep OFFSET':>12}")
+        async with Session() as session:
+            for size, conversation_id in conversations.items():
+                full = await _timed(lambda: get_last_n_messages(session, conversation_id, n=99999), args.repeat)
+                latest = await _timed(lambda: get_messages_page(session, conversation_id, args.page), args.repeat * 5)
+
+                # A page halfway back in time
+                deep_offset = size // 2
+                middle = (start + timedelta(seconds=size - deep_offset), 0)
+                deep = await _timed(
+                    lambda: get_messages_page(session, conversation_id, args.page, before=middle), args.repeat * 5
+                )
+                offset = await _timed(
+                    lambda: _offset_page(session, conversation_id, deep_offset, args.page), args.repeat * 5
+                )
+                print(f"  {size:>9,} {full:>13.1f} {latest:>12.2f} {deep:>12.2f} {offset:>12.2f}")
+        print()
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,50000")
+    parser.add_argument("--page", type=int, default=50)
+    parser.add_argument("--noise", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    asyncio.run(run(parser.parse_args()))
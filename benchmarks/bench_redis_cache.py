@@ -0,0 +1,192 @@
+"""
+Concurrent cache-hit throughput: the old CacheManager (sync redis.Redis
+inside async methods) versus the async pooled client, with and without the
+in-process L1.
+
+The Redis stand-in is a minimal RESP server running on its own thread and
+event loop. It adds `--rtt-ms` to every reply to model a hosted Redis.
+`--clients` coroutines each read one cached insight `--requests` times, the
+way concurrent /insights/hero hits do. Also compares `--keys` separate GETs
+with one get_many (MGET).
+
+    python -m benchmarks.bench_redis_cache [--clients 50 --requests 20 --rtt-ms 2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+
+PAYLOAD = json.dumps({
+    "insight": "You tend to feel calmer on days you start with a run. " * 8,
+    "suggestion": "Keep mornings protected before exams.",
+})
+
+
+# ------------------------------
+# RESP stand-in
+# ------------------------------
+class StandInRedis:
+    def __init__(self, rtt_ms: float):
+        self.rtt = rtt_ms / 1000
+        self.data = {}
+        self.port = None
+        self._ready = threading.Event()
+        self._loop = None
+
+    def start(self):
+        threading.Thread(target=self._serve_forever, daemon=True).start()
+        self._ready.wait()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _serve_forever(self):
+        self._loop = asyncio.new_event_loop()
+        server = self._loop.run_until_complete(asyncio.start_server(self._client, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    @staticmethod
+    async def _read_command(reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        argc = int(line[1:])
+        args = []
+        for _ in range(argc):
+            size = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    @staticmethod
+    def _bulk(value):
+        return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _execute(self, args):
+        cmd = args[0].upper()
+        if cmd == b"GET":
+            return self._bulk(self.data.get(args[1]))
+        if cmd == b"MGET":
+            return b"*%d\r\n" % (len(args) - 1) + b"".join(self._bulk(self.data.get(k)) for k in args[1:])
+        if cmd == b"SETEX":
+            self.data[args[1]] = args[3]
+            return b"+OK\r\n"
+        if cmd == b"SET":
+            self.data[args[1]] = args[2]
+            return b"+OK\r\n"
+        if cmd == b"PING":
+            return b"+PONG\r\n"
+        if cmd == b"HELLO":
+            # RESP3 handshake (redis-py >= 8 default): a one-entry map
+            return b"%1\r\n$5\r\nproto\r\n:" + args[1] + b"\r\n"
+        return b"+OK\r\n"  # CLIENT SETINFO, SELECT, ...
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                if self.rtt:
+                    await asyncio.sleep(self.rtt)
+                writer.write(self._execute(args))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+# ------------------------------
+# Clients under test
+# ------------------------------
+async def old_get(sync_client, key):
+    """The previous CacheManager.get: async signature, blocking call."""
+    data = sync_client.get(key)
+    return json.loads(data) if data else None
+
+
+async def run(label, get, clients, requests):
+    async def one_client():
+        for _ in range(requests):
+            assert await get() is not None
+
+    # A 5 ms heartbeat: the largest gap between ticks is the longest time
+    # the event loop could not serve anything else
+    ticks = [time.perf_counter()]
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(0.005)
+            ticks.append(time.perf_counter())
+
+    hb = asyncio.create_task(heartbeat())
+    t0 = ticks[0]
+    await asyncio.gather(*(one_client() for _ in range(clients)))
+    wall = time.perf_counter() - t0
+    ticks.append(time.perf_counter())
+    hb.cancel()
+    stall = max(b - a for a, b in zip(ticks, ticks[1:])) - 0.005
+
+    total = clients * requests
+    print(
+        f"{label:28} hits/s={total / wall:9,.0f}  wall={wall:6.2f}s  "
+        f"max loop stall={max(stall, 0) * 1000:7.1f} ms"
+    )
+
+
+async def main(args, url):
+    import redis
+    from app.services.cache import redis_manager
+    from app.services.cache.redis_manager import CacheManager
+
+    keys = [f"insights:hero:{i}" for i in range(args.keys)]
+    for key in keys:
+        await CacheManager.set(key, json.loads(PAYLOAD))
+    # Transport comparison: keep the L1 in-process cache out of the way
+    l1_entries = redis_manager.l1.max_entries
+    redis_manager.l1.max_entries = 0
+    redis_manager.l1.clear()
+
+    sync_client = redis.Redis.from_url(url)
+    print(f"{args.clients} concurrent clients x {args.requests} hits, rtt={args.rtt_ms}ms\n")
+    await run("sync client (old)", lambda: old_get(sync_client, keys[0]), args.clients, args.requests)
+    await run("async pooled (new)", lambda: CacheManager.get(keys[0]), args.clients, args.requests)
+    redis_manager.l1.max_entries = l1_entries
+    await run("async pooled + L1", lambda: CacheManager.get(keys[0]), args.clients, args.requests)
+    redis_manager.l1.max_entries = 0
+    redis_manager.l1.clear()
+
+    print(f"\nreading {args.keys} keys:")
+    t0 = time.perf_counter()
+    for key in keys:
+        await CacheManager.get(key)
+    print(f"  {args.keys} x GET      {(time.perf_counter() - t0) * 1000:7.1f} ms")
+    t0 = time.perf_counter()
+    await CacheManager.get_many(keys)
+    print(f"  1 x MGET        {(time.perf_counter() - t0) * 1000:7.1f} ms")
+
+    sync_client.close()
+    await redis_manager.close_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=2.0)
+    parser.add_argument("--keys", type=int, default=20)
+    args = parser.parse_args()
+
+    server = StandInRedis(args.rtt_ms)
+    server.start()
+    url = f"redis://127.0.0.1:{server.port}/0"
+    # Settings are read at import time by redis_manager
+    os.environ["REDIS_URL"] = url
+    try:
+        asyncio.run(main(args, url))
+    finally:
+        server.stop()
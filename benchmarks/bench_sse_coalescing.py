@@ -0,0 +1,91 @@
+"""
+SSE event volume and CPU per stream: one event per token (old) versus
+coalesce_tokens with a time/size flush window (new).
+
+Each stream replays a fake model emitting `--tokens` tokens at `--rate`
+tokens/s; `--streams` run concurrently, as on a busy worker. Every emitted
+chunk pays json.dumps + SSE framing + bytes encoding, like the chat route.
+
+    python -m benchmarks.bench_sse_coalescing [--streams 50 --tokens 600 --rate 200]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.services.chat.sse import coalesce_tokens
+
+WORDS = ["I ", "hear ", "you", ", ", "and ", "that ", "sounds ", "like ", "a ", "lot", ". "]
+
+
+async def fake_model_stream(n: int, rate: float):
+    interval = 1 / rate
+    for i in range(n):
+        # Bedrock delivers tokens in small network bursts
+        if i % 4 == 0:
+            await asyncio.sleep(interval * 4)
+        yield WORDS[i % len(WORDS)]
+
+
+def _sse_frame(chunk: str) -> bytes:
+    data = json.dumps({"chunk": chunk})
+    return f"event: message\r\ndata: {data}\r\n\r\n".encode("utf-8")
+
+
+async def old_stream(n, rate):
+    full_reply = ""
+    events = 0
+    sent = 0
+    async for chunk in fake_model_stream(n, rate):
+        full_reply += chunk
+        sent += len(_sse_frame(chunk))
+        events += 1
+    return events, sent, len(full_reply)
+
+
+async def new_stream(n, rate, interval_ms, flush_bytes):
+    reply_parts = []
+    events = 0
+    sent = 0
+    async for chunk in coalesce_tokens(fake_model_stream(n, rate), interval_ms, flush_bytes):
+        reply_parts.append(chunk)
+        sent += len(_sse_frame(chunk))
+        events += 1
+    return events, sent, len("".join(reply_parts))
+
+
+async def run(label, make, streams):
+    cpu0, wall0 = time.process_time(), time.perf_counter()
+    results = await asyncio.gather(*(make() for _ in range(streams)))
+    cpu, wall = time.process_time() - cpu0, time.perf_counter() - wall0
+
+    events = sum(r[0] for r in results)
+    sent = sum(r[1] for r in results)
+    print(
+        f"{label:34} events/stream={events / streams:7.0f}  "
+        f"events/s={events / wall:9,.0f}  "
+        f"CPU/stream={cpu / streams * 1000:7.2f} ms  "
+        f"bytes/stream={sent / streams:8,.0f}"
+    )
+    return results
+
+
+async def main(args):
+    print(f"{args.streams} concurrent streams, {args.tokens} tokens each at {args.rate:.0f} tok/s\n")
+    old = await run("one event per token (old)", lambda: old_stream(args.tokens, args.rate), args.streams)
+    new = await run(
+        f"coalesced {args.interval_ms}ms/{args.flush_bytes}B (new)",
+        lambda: new_stream(args.tokens, args.rate, args.interval_ms, args.flush_bytes),
+        args.streams,
+    )
+    assert old[0][2] == new[0][2], "reply text must be identical"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", type=int, default=50)
+    parser.add_argument("--tokens", type=int, default=600)
+    parser.add_argument("--rate", type=float, default=200.0)
+    parser.add_argument("--interval-ms", type=int, default=40)
+    parser.add_argument("--flush-bytes", type=int, default=256)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,129 @@
+"""
+Token streaming overhead: callback + unbounded asyncio.Queue bridge (old)
+versus native async iteration through bounded_iter (new).
+
+A fake model stream yields N tokens; every path hands them to a consumer
+that does no work. The shipped configuration is
+settings.llm_stream_buffer_size (0: pull-driven pass-through); a
+read-ahead buffer of 32 is measured alongside. Reports tokens/s and per-token overhead over a raw
+`async for` baseline, plus the peak buffered tokens behind a slow consumer.
+
+    python -m benchmarks.bench_token_stream [--tokens 200000]
+"""
+import argparse
+import asyncio
+import time
+
+from app.config.settings import settings
+from app.services.llm.streaming import bounded_iter
+
+DEFAULT_BUFFER = settings.llm_stream_buffer_size
+READ_AHEAD_BUFFER = 32
+
+
+async def fake_model_stream(n: int, every: int = 16):
+    # Yield to the loop periodically, like network reads would
+    for i in range(n):
+        if i % every == 0:
+            await asyncio.sleep(0)
+        yield "tok "
+
+
+# ------------------------------
+# Old path (pre user-002)
+# ------------------------------
+class _QueueCallbackHandler:
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def on_llm_new_token(self, token, **kwargs) -> None:
+        if isinstance(token, list):
+            token = "".join(part.get("text", "") for part in token)
+        await self.queue.put(str(token))
+
+
+async def queue_bridge(source):
+    queue: asyncio.Queue = asyncio.Queue()
+    callback = _QueueCallbackHandler(queue)
+
+    async def _run():
+        try:
+            async for token in source:
+                await callback.on_llm_new_token(token)
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(_run())
+    while True:
+        token = await queue.get()
+        if token is None:
+            break
+        yield token
+    await task
+
+
+# ------------------------------
+# Measurement
+# ------------------------------
+async def _drain(stream) -> float:
+    start = time.perf_counter()
+    async for _ in stream:
+        pass
+    return time.perf_counter() - start
+
+
+async def _peak_buffer(make_stream, n: int) -> int:
+    """Slow consumer: how many tokens pile up between producer and consumer?"""
+    produced = 0
+
+    async def counting():
+        nonlocal produced
+        async for tok in fake_model_stream(n):
+            produced += 1
+            yield tok
+
+    consumed = 0
+    peak = 0
+    async for _ in make_stream(counting()):
+        consumed += 1
+        peak = max(peak, produced - consumed)
+        await asyncio.sleep(0.0005)
+    return peak
+
+
+async def main(n: int, rounds: int):
+    paths = {
+        "raw async for (baseline)": lambda src: src,
+        "callback + unbounded Queue (old)": queue_bridge,
+        f"bounded_iter maxsize={DEFAULT_BUFFER} (new, default)": lambda src: bounded_iter(src, DEFAULT_BUFFER),
+    }
+    if READ_AHEAD_BUFFER != DEFAULT_BUFFER:
+        paths[f"bounded_iter maxsize={READ_AHEAD_BUFFER} (read-ahead)"] = (
+            lambda src: bounded_iter(src, READ_AHEAD_BUFFER)
+        )
+
+    results = {}
+    for name, make in paths.items():
+        best = min([await _drain(make(fake_model_stream(n))) for _ in range(rounds)])
+        results[name] = best
+
+    base = results["raw async for (baseline)"]
+    print(f"tokens per run: {n}, best of {rounds}")
+    print(f"{'path':42} {'tokens/s':>12} {'overhead ns/token':>18}")
+    for name, elapsed in results.items():
+        overhead = (elapsed - base) / n * 1e9
+        print(f"{name:42} {n / elapsed:12,.0f} {overhead:18.0f}")
+
+    print("\npeak tokens buffered behind a slow consumer (2,000 tokens):")
+    print(f"  old (unbounded):               {await _peak_buffer(queue_bridge, 2000)}")
+    for size in dict.fromkeys((DEFAULT_BUFFER, READ_AHEAD_BUFFER)):
+        label = f"new (maxsize={size}{', default' if size == DEFAULT_BUFFER else ''}):"
+        print(f"  {label:30} {await _peak_buffer(lambda s: bounded_iter(s, size), 2000)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=200_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.rounds))
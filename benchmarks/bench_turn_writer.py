@@ -0,0 +1,128 @@
+"""
+Chat turn persistence under concurrency: one transaction per turn (ORM
+unit of work, as persist_chat_data did) versus the group-commit TurnWriter.
+
+`--concurrency` requests each persist `--turns` turns back to back, spread
+over `--conversations` conversations. Runs on SQLite by default; pass a
+postgresql+asyncpg URL to measure Postgres (tables are created and dropped).
+
+    python -m benchmarks.bench_turn_writer [--concurrency 200 --turns 5 --database-url ...]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.db import Base
+from app.models import chat, user  # noqa: F401  (registers the tables)
+from app.models.chat import ChatHistory, Conversation
+from app.models.user import User
+from app.services.conversations.conversations_service import (
+    add_message_to_history,
+    record_conversation_activity,
+)
+from app.services.conversations.turn_writer import TurnWriter
+
+REPLY = "lorem ipsum dolor sit amet " * 40
+
+
+async def _per_turn(Session, user_id, conversation_id, i):
+    async with Session() as session:
+        await add_message_to_history(session, user_id, conversation_id, "user", f"question {i}")
+        await add_message_to_history(session, user_id, conversation_id, "assistant", REPLY)
+        await record_conversation_activity(session, conversation_id, 2, datetime.utcnow())
+        await session.commit()
+
+
+async def _measure(label, persist, args, conversations):
+    latencies = []
+
+    async def client(c):
+        for t in range(args.turns):
+            t0 = time.perf_counter()
+            await persist(conversations[(c + t) % len(conversations)], c * args.turns + t)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    total = args.concurrency * args.turns
+    print(
+        f"  {label:<22} {total / elapsed:>9.0f} {statistics.median(latencies):>9.1f} "
+        f"{latencies[int(len(latencies) * 0.99) - 1]:>9.1f}"
+    )
+
+
+async def run(args):
+    url = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench.db"
+    engine = create_async_engine(url, pool_size=args.pool_size, max_overflow=0)
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    user_id = uuid.uuid4()
+    conversations = [uuid.uuid4() for _ in range(args.conversations)]
+    async with Session() as session:
+        session.add(User(user_id=user_id, user_name="bench", email="bench@example.com", hashed_password="x"))
+        await session.flush()
+        for conversation_id in conversations:
+            session.add(Conversation(id=conversation_id, user_id=user_id, title="bench"))
+        await session.commit()
+
+    print(f"{url.split(':')[0]}  {args.concurrency} concurrent requests x {args.turns} turns, pool {args.pool_size}\n")
+    print(f"  {'':<22} {'turns/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+
+    await _measure(
+        "transaction per turn",
+        lambda conversation_id, i: _per_turn(Session, user_id, conversation_id, i),
+        args,
+        conversations,
+    )
+
+    writer = TurnWriter(
+        max_batch_turns=args.batch,
+        flush_interval_ms=args.flush_ms,
+        session_factory=Session,
+    )
+    writer.start()
+    await _measure(
+        "group commit",
+        lambda conversation_id, i: writer.submit(user_id, conversation_id, f"question {i}", REPLY),
+        args,
+        conversations,
+    )
+    await writer.stop()
+    stats = writer.stats()
+    print(f"\n  group commit: {stats['flushes']} transactions, avg batch {stats['avg_batch_turns']} turns")
+
+    async with Session() as session:
+        rows = (await session.execute(select(func.count()).select_from(ChatHistory))).scalar()
+        counted = (await session.execute(select(func.sum(Conversation.message_count)))).scalar()
+    print(f"  rows written: {rows}, message_count total: {counted}")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--flush-ms", type=float, default=5.0)
+    parser.add_argument("--database-url", default=os.environ.get("BENCH_DATABASE_URL"))
+    asyncio.run(run(parser.parse_args()))
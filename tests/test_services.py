@@ -0,0 +1,159 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.memory.local_engine import LocalMemoryEngine
+
+
+# -----------------------------
+# LOCAL MEMORY ENGINE
+# -----------------------------
+def test_concurrent_adds_get_unique_ids(tmp_path):
+    engine = LocalMemoryEngine(str(tmp_path))
+    user_id = str(uuid.uuid4())
+
+    def add(i):
+        messages = [{"role": "user", "content": f"memory {i} a"}, {"role": "user", "content": f"memory {i} b"}]
+        return [r["id"] for r in engine.add(messages, user_id=user_id)["results"]]
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = [memory_id for batch in pool.map(add, range(200)) for memory_id in batch]
+
+    assert len(ids) == len(set(ids)) == 400
+    for memory_id in ids[:20]:
+        assert engine.get(memory_id)["id"] == memory_id
+
+
+def test_orphan_record_line_is_not_listed(tmp_path):
+    engine = LocalMemoryEngine(str(tmp_path))
+    user_id = str(uuid.uuid4())
+    engine.add([{"role": "user", "content": "first"}], user_id=user_id)
+
+    # Crash between the records.jsonl write and the offsets write
+    index = engine._index(user_id)
+    with open(index.records_path, "ab") as f:
+        f.write(b'{"id": "orphan", "memory": "orphan"}\n')
+
+    engine.add([{"role": "user", "content": "second"}], user_id=user_id)
+
+    assert [m["memory"] for m in engine.get_all(user_id)] == ["first", "second"]
+    page, _ = engine.get_page(user_id, filters={"AND": [{"user_id": user_id}]})
+    assert [m["memory"] for m in page] == ["first", "second"]
+
+
+def test_get_does_not_return_another_users_memory(tmp_path):
+    engine = LocalMemoryEngine(str(tmp_path))
+    owner, other = str(uuid.uuid4()), str(uuid.uuid4())
+    memory_id = engine.add([{"role": "user", "content": "private"}], user_id=owner)["results"][0]["id"]
+
+    assert engine.get(memory_id, user_id=owner)["memory"] == "private"
+    assert engine.get(memory_id, user_id=other) is None
+    assert engine.get(f"{other}:0", user_id=other) is None
+
+
+# -----------------------------
+# MEMORY LISTING CURSORS
+# -----------------------------
+def test_tampered_memory_cursor_is_rejected(monkeypatch):
+    from app.services.memory import memory_listing
+    from app.services.memory.memory_listing import InvalidCursor, decode_cursor, encode_cursor
+
+    monkeypatch.setattr(memory_listing.mem0, "mode", "local")
+    assert decode_cursor(encode_cursor("40", "health"), "health") == "40"
+    for backend_cursor in ("x", "-1", "1.5", 7):
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(backend_cursor, None), None)
+
+    monkeypatch.setattr(memory_listing.mem0, "mode", "client")
+    assert decode_cursor(encode_cursor("2", None), None) == "2"
+    with pytest.raises(InvalidCursor):
+        decode_cursor(encode_cursor("0", None), None)
+
+
+# -----------------------------
+# SSE TOKEN COALESCING
+# -----------------------------
+@pytest.mark.parametrize("flush_interval_ms", [0, 40])
+def test_closing_coalescer_closes_upstream(flush_interval_ms):
+    from app.services.chat.sse import coalesce_tokens
+
+    closed = []
+
+    async def upstream():
+        try:
+            while True:
+                yield "tok "
+                await asyncio.sleep(0)
+        finally:
+            closed.append(True)
+
+    async def run():
+        chunks = coalesce_tokens(upstream(), flush_interval_ms=flush_interval_ms)
+        await chunks.__anext__()
+        await chunks.aclose()
+        # Before the loop's own async-generator cleanup at shutdown
+        assert closed == [True]
+
+    asyncio.run(run())
+
+
+# -----------------------------
+# TURN WRITER
+# -----------------------------
+def test_failed_commit_is_not_retried():
+    from app.services.conversations import turn_writer as tw
+
+    writes = []
+
+    class Writer(tw.TurnWriter):
+        async def _write(self, batch):
+            writes.append(len(batch))
+            raise tw.CommitOutcomeUnknown("connection lost during COMMIT")
+
+    async def run():
+        writer = Writer(flush_interval_ms=1)
+        results = await asyncio.gather(
+            *(writer.submit(uuid.uuid4(), uuid.uuid4(), "hi", "hello") for _ in range(4)),
+            return_exceptions=True,
+        )
+        await writer.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert writes == [4]
+    assert all(isinstance(r, tw.CommitOutcomeUnknown) for r in results)
+
+
+# -----------------------------
+# STREAM HUB
+# -----------------------------
+def test_subscriber_follows_stream_and_reports_evicted_events():
+    from app.services.chat.stream_hub import LiveStream, StreamHub
+
+    async def run():
+        hub = StreamHub(buffer_size=4, resume_grace_seconds=60)
+        stream = LiveStream(str(uuid.uuid4()), "user", buffer_size=4)
+
+        # Keeps up: every event once, in order, until the terminal one
+        follower = hub.subscribe(stream)
+        stream.publish("message", {"chunk": "a"})
+        stream.publish("message", {"chunk": "b"})
+        seen = [await follower.__anext__(), await follower.__anext__()]
+        stream.publish("done", {})
+        seen += [e async for e in follower]
+        assert [e["id"].rsplit(":", 1)[1] for e in seen] == ["1", "2", "3"]
+
+        # Falls behind by more than the buffer: an error, not a silent gap
+        stream = LiveStream(str(uuid.uuid4()), "user", buffer_size=4)
+        laggard = hub.subscribe(stream)
+        stream.publish("message", {"chunk": "0"})
+        first = await laggard.__anext__()
+        for i in range(6):
+            stream.publish("message", {"chunk": str(i)})
+        second = await laggard.__anext__()
+        assert first["id"].endswith(":1")
+        assert second["event"] == "error" and "resume_window_exceeded" in second["data"]
+
+    asyncio.run(run())